@@ -10,3 +10,17 @@ ERP_URL = os.getenv("ERP_URL", "http://localhost:8080")
 ERP_API_KEY = os.getenv("ERP_API_KEY", "")
 ERP_API_SECRET = os.getenv("ERP_API_SECRET", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+
+# Historical item rate cache (":memory:" keeps it per process)
+RATE_CACHE_PATH = os.getenv("RATE_CACHE_PATH", ":memory:")
+RATE_CACHE_TTL = int(os.getenv("RATE_CACHE_TTL", "900"))
+
+# PDF export: both off by default. PDF_CACHE_DIR caches rendered PDFs on disk
+# (use a directory private to the app; cached PDFs keep their "Generated:"
+# time) and PDF_RENDER_WORKERS > 0 renders in a process pool instead of the
+# request thread.
+# PDF_BACKEND is "reportlab" or "weasyprint" (falls back to ReportLab if not installed)
+PDF_BACKEND = os.getenv("PDF_BACKEND", "reportlab").lower()
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "")
+PDF_CACHE_TTL = int(os.getenv("PDF_CACHE_TTL", "3600"))
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "0"))
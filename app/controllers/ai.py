@@ -1,16 +1,18 @@
 """AI controllers - Report generation."""
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+import json
 import logging
-from app.models import AIReportRequest, ERPNextClient
-from app.services.ai_report_generator import AIReportGenerator
+from app.models import AIReportRequest, get_shared_client
+from app.services.ai_report_generator import get_ai_report_generator
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["ai"])
 
 
 def get_client():
-    """Lazy-load ERPNext client."""
-    return ERPNextClient()
+    """Lazy-load the shared ERPNext client."""
+    return get_shared_client()
 
 
 def _compute_po_summary(pos):
@@ -108,9 +110,8 @@ def ai_report(req: AIReportRequest):
         
         # Step 3: Generate AI report
         try:
-            logger.info("Creating AIReportGenerator...")
-            ai_gen = AIReportGenerator()
-            logger.info("AIReportGenerator created, calling generate_procurement_report...")
+            ai_gen = get_ai_report_generator()
+            logger.info("Calling generate_procurement_report...")
             
             result = ai_gen.generate_procurement_report(summary, req.query)
             logger.info(f"AI generation result: success={result.get('success')}")
@@ -147,3 +148,58 @@ def ai_report(req: AIReportRequest):
     except Exception as e:  # pragma: no cover
         logger.error(f"Unexpected error in ai_report: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/ai/report/stream")
+def ai_report_stream(req: AIReportRequest):
+    """
+    Stream an AI procurement report as Server-Sent Events.
+    
+    Request: POST /ai/report/stream
+    Body: {"query": "Generate monthly procurement report"}
+    
+    Each event is `data: "<text chunk>"` (JSON-encoded), followed by
+    `data: [DONE]`. Failures while generating are sent as an `error` event.
+    When there is no data or the generator cannot start, the same JSON
+    error body as /ai/report is returned instead of a stream.
+    """
+    try:
+        pos = get_client().list_purchase_orders()
+    except Exception as e:
+        logger.error(f"ERPNext fetch error: {str(e)}")
+        pos = []
+    
+    if not pos:
+        return {
+            "success": False,
+            "message": "No purchase order data available",
+            "intent": "ai_report",
+            "ai_generated": True
+        }
+    
+    summary = _compute_po_summary(pos)
+    summary['date_range'] = 'This Period'
+    
+    try:
+        ai_gen = get_ai_report_generator()
+    except Exception as e:
+        logger.error(f"AI generation error: {str(e)}")
+        return {
+            "success": False,
+            "message": f"Error generating report: {str(e)}",
+            "intent": "ai_report",
+            "ai_generated": True,
+            "error": str(e)
+        }
+    
+    def events():
+        try:
+            for text in ai_gen.generate_procurement_report_stream(summary, req.query):
+                yield f"data: {json.dumps(text)}\n\n"
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            logger.error(f"AI streaming error: {str(e)}", exc_info=True)
+            error = {"message": f"Error generating report: {str(e)}", "error": str(e)}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
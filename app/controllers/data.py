@@ -1,38 +1,62 @@
 """Data controllers - Suppliers, Items, Purchase Orders, etc."""
-from fastapi import APIRouter, HTTPException
-from app.models import ERPNextClient
+import hashlib
+import json
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response
+from app.models import get_shared_client
+from app.services.po_approval_analyzer import prefetch_rates
 
 router = APIRouter(tags=["data"])
 
 
 def get_client():  # pragma: no cover
-    """Lazy-load ERPNext client."""
-    return ERPNextClient()
+    """Lazy-load the shared ERPNext client."""
+    return get_shared_client()
+
+
+def _etag_response(request: Request, payload: dict) -> Response:
+    """
+    Serialize payload once, tag it with a content hash and honour If-None-Match.
+
+    Returns 304 with no body when the client already holds the same payload.
+    """
+    body = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 
 @router.get("/suppliers")
-def list_suppliers():
+def list_suppliers(request: Request):
     """List all suppliers."""
     try:
-        return {"data": get_client().list_suppliers()}
+        return _etag_response(request, {"data": get_client().list_suppliers()})
     except Exception as e:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/items")
-def list_items():
+def list_items(request: Request):
     """List all items."""
     try:
-        return {"data": get_client().list_items()}
+        return _etag_response(request, {"data": get_client().list_items()})
     except Exception as e:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/purchase-orders")
-def list_purchase_orders(limit: int = 20):
-    """List purchase orders."""
+def list_purchase_orders(request: Request, background_tasks: BackgroundTasks, limit: int = 20):
+    """List purchase orders and warm the PO approval rate cache after responding."""
     try:
-        return {"data": get_client().list_purchase_orders(limit)}
+        client = get_client()
+        response = _etag_response(request, {"data": client.list_purchase_orders(limit)})
+        # A 304 means the caller already has this list; no need to re-warm
+        if response.status_code == 200:
+            background_tasks.add_task(prefetch_rates, client)
+        return response
     except Exception as e:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,7 +1,7 @@
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 from app.copilot.intent import parse_intent
-from app.models import ERPNextClient
+from app.models import get_shared_client
 from app.services.insights import build_purchase_order_insights
 from app.services.price_anomaly_detector import detect_price_anomalies
 from app.services.delayed_orders_detector import detect_delayed_orders
@@ -247,7 +247,7 @@ def handle_user_input(text: str) -> Dict[str, Any]:
         parsed = parse_intent(text)
         intent = parsed.get("intent")
         
-        client = ERPNextClient()
+        client = get_shared_client()
         
         if not intent or intent == "unknown":
             return {
@@ -7,7 +7,8 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
 from fastapi.middleware.cors import CORSMiddleware
-import os
+from contextlib import asynccontextmanager
+from pathlib import Path
 import logging
 
 # Import routers (controllers)
@@ -20,11 +21,28 @@ from app.controllers import (
 
 logger = logging.getLogger(__name__)
 
+# Resolve template/static locations once at import time
+BASE_DIR = Path(__file__).resolve().parent
+TEMPLATES_DIR = BASE_DIR / "templates"
+STATIC_DIR = BASE_DIR / "static"
+
+# Set up Jinja2 templates
+templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Compile the homepage template once so the first request hits Jinja's cache."""
+    templates.get_template("copilot.html")
+    yield
+
+
 # Create FastAPI app
 app = FastAPI(
     title="ERPNext Business Copilot",
     description="AI-powered assistant for ERPNext business data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware to allow requests from frontend
@@ -36,10 +54,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Set up Jinja2 templates
-templates_dir = os.path.join(os.path.dirname(__file__), "templates")
-templates = Jinja2Templates(directory=templates_dir)
-
 # Include all routers (controllers)
 app.include_router(data_router)
 app.include_router(copilot_router)
@@ -60,6 +74,5 @@ def health():
 
 
 # Mount static files if they exist
-static_dir = os.path.join(os.path.dirname(__file__), "static")
-if os.path.exists(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+if STATIC_DIR.is_dir():
+    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
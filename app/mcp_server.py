@@ -16,6 +16,7 @@ Architecture:
 - Standalone MCP server (independent of REST API)
 """
 
+import asyncio
 import json
 import logging
 from typing import Any, Dict
@@ -26,7 +27,7 @@ from mcp.types import Tool, TextContent
 
 # Import existing service layer
 from app.copilot.service import handle_user_input
-from app.models.erp_client import ERPNextClient
+from app.models.erp_client import ERPNextClient, get_shared_client
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -35,8 +36,10 @@ logger = logging.getLogger(__name__)
 # Initialize MCP server
 mcp = Server("erpnext-copilot")
 
-# Initialize client
-client = ERPNextClient()
+
+def get_client() -> ERPNextClient:
+    """The process-wide ERPNext client (and its keep-alive session)."""
+    return get_shared_client()
 
 
 # ============================================================================
@@ -114,12 +117,14 @@ TOOLS = [
 # ============================================================================
 # HANDLER FUNCTIONS (wrap existing service logic)
 # ============================================================================
+# ERPNextClient is blocking (requests); each handler runs it in a worker thread
+# so concurrent tool calls from the LLM don't stall the MCP event loop.
 
 
-def handle_list_suppliers() -> Dict[str, Any]:
+async def handle_list_suppliers() -> Dict[str, Any]:
     """List all suppliers - wraps client.list_suppliers()"""
     try:
-        suppliers = client.list_suppliers()
+        suppliers = await asyncio.to_thread(get_client().list_suppliers)
         return {
             "success": True,
             "count": len(suppliers) if suppliers else 0,
@@ -133,10 +138,10 @@ def handle_list_suppliers() -> Dict[str, Any]:
         }
 
 
-def handle_list_items() -> Dict[str, Any]:
+async def handle_list_items() -> Dict[str, Any]:
     """List all items - wraps client.list_items()"""
     try:
-        items = client.list_items()
+        items = await asyncio.to_thread(get_client().list_items)
         return {
             "success": True,
             "count": len(items) if items else 0,
@@ -150,10 +155,10 @@ def handle_list_items() -> Dict[str, Any]:
         }
 
 
-def handle_list_purchase_orders(limit: int = 50) -> Dict[str, Any]:
+async def handle_list_purchase_orders(limit: int = 50) -> Dict[str, Any]:
     """List purchase orders - wraps client.list_purchase_orders()"""
     try:
-        pos = client.list_purchase_orders(limit=limit)
+        pos = await asyncio.to_thread(get_client().list_purchase_orders, limit=limit)
         return {
             "success": True,
             "count": len(pos) if pos else 0,
@@ -168,10 +173,10 @@ def handle_list_purchase_orders(limit: int = 50) -> Dict[str, Any]:
         }
 
 
-def handle_get_purchase_order(po_name: str) -> Dict[str, Any]:
+async def handle_get_purchase_order(po_name: str) -> Dict[str, Any]:
     """Get PO details - wraps client.get_purchase_order()"""
     try:
-        po = client.get_purchase_order(po_name)
+        po = await asyncio.to_thread(get_client().get_purchase_order, po_name)
         return {
             "success": True,
             "purchase_order": po,
@@ -184,10 +189,10 @@ def handle_get_purchase_order(po_name: str) -> Dict[str, Any]:
         }
 
 
-def handle_copilot_ask(query: str, limit: int = 20) -> Dict[str, Any]:
+async def handle_copilot_ask(query: str, limit: int = 20) -> Dict[str, Any]:
     """Ask copilot - wraps handle_user_input() from service layer"""
     try:
-        response = handle_user_input(query)
+        response = await asyncio.to_thread(handle_user_input, query)
         return {
             "success": True,
             "query": query,
@@ -224,21 +229,21 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         result = None
 
         if name == "list_suppliers":
-            result = handle_list_suppliers()
+            result = await handle_list_suppliers()
 
         elif name == "list_items":
-            result = handle_list_items()
+            result = await handle_list_items()
 
         elif name == "list_purchase_orders":
             limit = arguments.get("limit", 50)
-            result = handle_list_purchase_orders(limit)
+            result = await handle_list_purchase_orders(limit)
 
         elif name == "get_purchase_order":
             po_name = arguments.get("po_name")
             if not po_name:
                 result = {"success": False, "error": "po_name parameter is required"}
             else:
-                result = handle_get_purchase_order(po_name)
+                result = await handle_get_purchase_order(po_name)
 
         elif name == "copilot_ask":
             query = arguments.get("query")
@@ -246,7 +251,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                 result = {"success": False, "error": "query parameter is required"}
             else:
                 limit = arguments.get("limit", 20)
-                result = handle_copilot_ask(query, limit)
+                result = await handle_copilot_ask(query, limit)
 
         else:
             result = {"success": False, "error": f"Unknown tool: {name}"}
@@ -4,11 +4,12 @@ from app.models.schemas import (
     PurchaseOrderExportRequest,
     AIReportRequest,
 )
-from app.models.erp_client import ERPNextClient
+from app.models.erp_client import ERPNextClient, get_shared_client
 
 __all__ = [
     "QueryRequest",
     "PurchaseOrderExportRequest",
     "AIReportRequest",
     "ERPNextClient",
+    "get_shared_client",
 ]
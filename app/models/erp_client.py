@@ -1,4 +1,7 @@
+import functools
+import json
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import quote
 from app.config import ERP_URL, ERP_API_KEY, ERP_API_SECRET
 
@@ -15,12 +18,19 @@ class ERPNextClient:
             "Authorization": f"token {ERP_API_KEY}:{ERP_API_SECRET}"
         }
 
+        # Keep-alive session so repeated calls reuse the same TCP/TLS connection
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
     # -------------------------
     # Suppliers
     # -------------------------
     def list_suppliers(self):
         url = f"{self.base}/api/resource/Supplier"
-        r = requests.get(url, headers=self.headers, timeout=20)
+        r = self.session.get(url, timeout=20)
         r.raise_for_status()
         return r.json().get("data", [])
 
@@ -32,23 +42,26 @@ class ERPNextClient:
         params = {
             "fields": '["name","item_name"]'
         }
-        r = requests.get(url, headers=self.headers, params=params, timeout=20)
+        r = self.session.get(url, params=params, timeout=20)
         r.raise_for_status()
         return r.json().get("data", [])
 
     # -------------------------
     # Purchase Orders
     # -------------------------
-    def list_purchase_orders(self, limit: int = 20):
+    def list_purchase_orders(self, limit: int = 20, filters=None, fields=None):
         doctype = quote("Purchase Order")  # Purchase%20Order
         url = f"{self.base}/api/resource/{doctype}"
 
+        # limit=0 returns every matching row; filters/fields use Frappe list syntax
         params = {
-            "fields": '["name","supplier","transaction_date","status","grand_total"]',
+            "fields": json.dumps(fields) if fields else '["name","supplier","transaction_date","status","grand_total"]',
             "limit_page_length": limit,
         }
+        if filters:
+            params["filters"] = json.dumps(filters)
 
-        r = requests.get(url, headers=self.headers, params=params, timeout=20)
+        r = self.session.get(url, params=params, timeout=20)
         r.raise_for_status()
         return r.json().get("data", [])
 
@@ -56,7 +69,7 @@ class ERPNextClient:
         doctype = quote("Purchase Order")
         url = f"{self.base}/api/resource/{doctype}/{po_name}"
 
-        r = requests.get(url, headers=self.headers, timeout=20)
+        r = self.session.get(url, timeout=20)
         r.raise_for_status()
         return r.json().get("data", {})
 
@@ -68,7 +81,7 @@ class ERPNextClient:
         params = {
             "limit_page_length": limit,
         }
-        r = requests.get(url, headers=self.headers, params=params, timeout=20)
+        r = self.session.get(url, params=params, timeout=20)
         r.raise_for_status()
         return r.json().get("data", [])
 
@@ -82,14 +95,14 @@ class ERPNextClient:
             "fields": '["name","customer","transaction_date","status","grand_total","delivery_date"]',
             "limit_page_length": limit,
         }
-        r = requests.get(url, headers=self.headers, params=params, timeout=20)
+        r = self.session.get(url, params=params, timeout=20)
         r.raise_for_status()
         return r.json().get("data", [])
 
     def get_sales_order(self, so_name: str):
         doctype = quote("Sales Order")
         url = f"{self.base}/api/resource/{doctype}/{so_name}"
-        r = requests.get(url, headers=self.headers, timeout=20)
+        r = self.session.get(url, timeout=20)
         r.raise_for_status()
         return r.json().get("data", {})
 
@@ -103,10 +116,17 @@ class ERPNextClient:
             "fields": '["name","customer","posting_date","status","grand_total","outstanding_amount"]',
             "limit_page_length": limit,
         }
-        r = requests.get(url, headers=self.headers, params=params, timeout=20)
+        r = self.session.get(url, params=params, timeout=20)
         r.raise_for_status()
         return r.json().get("data", [])
 
+    def get_sales_invoice(self, si_name: str):
+        doctype = quote("Sales Invoice")
+        url = f"{self.base}/api/resource/{doctype}/{si_name}"
+        r = self.session.get(url, timeout=20)
+        r.raise_for_status()
+        return r.json().get("data", {})
+
     # -------------------------
     # Purchase Invoices (Vendor Bills)
     # -------------------------
@@ -117,6 +137,36 @@ class ERPNextClient:
             "fields": '["name","supplier","posting_date","status","grand_total","outstanding_amount"]',
             "limit_page_length": limit,
         }
-        r = requests.get(url, headers=self.headers, params=params, timeout=20)
+        r = self.session.get(url, params=params, timeout=20)
         r.raise_for_status()
         return r.json().get("data", [])
+
+    # -------------------------
+    # Quotations
+    # -------------------------
+    def list_quotations(self, limit: int = 50):
+        url = f"{self.base}/api/resource/Quotation"
+        params = {
+            "fields": '["name","party_name","transaction_date","status","grand_total"]',
+            "limit_page_length": limit,
+        }
+        r = self.session.get(url, params=params, timeout=20)
+        r.raise_for_status()
+        return r.json().get("data", [])
+
+    def get_quotation(self, qtn_name: str):
+        url = f"{self.base}/api/resource/Quotation/{qtn_name}"
+        r = self.session.get(url, timeout=20)
+        r.raise_for_status()
+        return r.json().get("data", {})
+
+
+@functools.lru_cache(maxsize=1)
+def get_shared_client() -> ERPNextClient:
+    """
+    Process-wide ERPNext client, created on first use.
+
+    Every caller shares its keep-alive Session and connection pool instead of
+    opening a new Session per request.
+    """
+    return ERPNextClient()
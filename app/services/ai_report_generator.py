@@ -6,34 +6,145 @@ Uses OpenAI to create narrative summaries of purchasing data.
 """
 
 import os
+import re
+import copy
+import json
+import time
+import random
+import string
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any
+import functools
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, List, Optional
 from datetime import datetime, timedelta
 
 # Try to import from modern openai package (>=1.0)
 try:
-    from openai import OpenAI, APIError, RateLimitError, APIConnectionError
+    from openai import OpenAI, AsyncOpenAI, APIError, RateLimitError, APIConnectionError
 except ImportError:
     # Fallback to legacy openai API (<1.0)
     import openai
     from openai.error import APIError, RateLimitError, APIConnectionError
     OpenAI = None
+    AsyncOpenAI = None
+
+try:
+    import httpx  # Installed with openai>=1.0
+except ImportError:  # pragma: no cover
+    httpx = None
 
 logger = logging.getLogger(__name__)
 
+_SYSTEM_MSG = "You are a professional procurement analyst. Generate well-structured, insightful procurement reports. Use clear section headers, professional business language, and focus on actionable insights. Format key metrics as bullet points. Use line breaks between sections for readability."
+
+# Static scaffold of the user prompt; _build_prompt only fills in the data.
+# The system message stays first and byte-identical across calls so the
+# provider's automatic prompt caching can reuse it.
+_PROMPT_TMPL = string.Template("""Generate a professional procurement report for $date_range.
+
+PROCUREMENT DATA:
+- Total Spending: $$$total_spend
+- Total Purchase Orders: $po_count
+- Pending Orders: $pending_count
+${status_text}${suppliers_text}
+
+FORMAT REQUIREMENTS:
+1. Create clear section headers in ALL CAPS
+2. Start with "EXECUTIVE SUMMARY" - brief overview of procurement activity
+3. Follow with "KEY METRICS" - use bullet points for key numbers
+4. Continue with "SPENDING ANALYSIS" - analyze spending patterns
+5. Add "SUPPLIER PERFORMANCE" - details about top suppliers
+6. Add "ORDER STATUS REVIEW" - review of order statuses
+7. End with "RECOMMENDATIONS" - actionable insights
+
+STYLE GUIDELINES:
+- Use professional business language
+- Write in clear paragraphs (not bullet points except for metrics)
+- Use line breaks between sections for readability
+- Highlight key insights and potential risks
+- Be concise but thorough
+- Focus on actionable recommendations
+- Format metrics as bullet points with bold labels
+
+Generate a well-structured report following this format.""")
+
+# Upper bound on completion tokens for one batched request
+_BATCH_MAX_TOKENS = 4096
+
+# Low temperature keeps section layout consistent between runs
+_TEMPERATURE = 0.2
+
+# ALL CAPS section headers requested by _PROMPT_TMPL, tolerating markdown
+# (#, **), numbering and a trailing colon
+_SECTION_HEADER_RE = re.compile(
+    r'^[ \t#*]*(?:\d+[.)][ \t]*)?'
+    r'(EXECUTIVE SUMMARY|KEY METRICS|SPENDING ANALYSIS|SUPPLIER PERFORMANCE|ORDER STATUS REVIEW|RECOMMENDATIONS?)'
+    r'[ \t*:]*$',
+    re.MULTILINE
+)
+
+# Report header -> display section (the UI shows four sections)
+_SECTION_FOR_HEADER = {
+    'EXECUTIVE SUMMARY': 'overview',
+    'KEY METRICS': 'overview',
+    'SPENDING ANALYSIS': 'analysis',
+    'SUPPLIER PERFORMANCE': 'analysis',
+    'ORDER STATUS REVIEW': 'trends',
+    'RECOMMENDATION': 'recommendation',
+    'RECOMMENDATIONS': 'recommendation',
+}
+
+
+class _TTLCache:
+    """Small LRU cache whose entries expire ttl seconds after insertion."""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        self._data.clear()
+
 
 class AIReportGenerator:
     """Generates AI-powered procurement reports using OpenAI."""
     
+    # Shared across instances: controllers may build a generator per request.
+    # Successful reports are reused for 10 minutes for identical summary+query.
+    _cache = _TTLCache(maxsize=256, ttl=600)
+    _cache_lock = threading.RLock()
+    
     def __init__(self):
         """Initialize OpenAI client from environment variable."""
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
+        api_key = self._load_settings()
         
         # Use modern API if available
         if OpenAI is not None:
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, http_client=_pooled_http_client())
             self.use_modern_api = True
         else:
             # Fall back to legacy API
@@ -42,6 +153,15 @@ class AIReportGenerator:
             self.client = openai
             self.use_modern_api = False
     
+    def _load_settings(self) -> str:
+        """Read model and max_tokens from the environment and return the OpenAI API key."""
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable not set")
+        self.model = os.getenv('COPILOT_MODEL', 'gpt-4o-mini')
+        self.max_tokens = int(os.getenv('COPILOT_MAX_TOKENS', '1500'))
+        return api_key
+    
     def generate_procurement_report(self, summary: Dict[str, Any], query: str = None) -> Dict[str, Any]:
         """
         Generate a structured procurement report from summary data.
@@ -67,6 +187,13 @@ class AIReportGenerator:
                 'generated_at': str (ISO timestamp)
             }
         """
+        cache_key = self._cache_key(summary, query)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        if cached is not None:
+            logger.info("AI report served from cache")
+            return self._stamped(cached)
+        
         try:
             # Build the prompt
             prompt = self._build_prompt(summary, query)
@@ -74,81 +201,326 @@ class AIReportGenerator:
             # Call OpenAI based on API version
             if self.use_modern_api:
                 response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
+                    model=self.model,
                     messages=[
                         {
                             "role": "system",
-                            "content": "You are a professional procurement analyst. Generate well-structured, insightful procurement reports. Use clear section headers, professional business language, and focus on actionable insights. Format key metrics as bullet points. Use line breaks between sections for readability."
+                            "content": _SYSTEM_MSG
                         },
                         {
                             "role": "user",
                             "content": prompt
                         }
                     ],
-                    temperature=0.7,
-                    max_tokens=1500,
+                    temperature=_TEMPERATURE,
+                    max_tokens=self.max_tokens,
                     timeout=30
                 )
                 report_text = response.choices[0].message.content
             else:  # pragma: no cover
                 # Legacy API support for openai <1.0
                 response = self.client.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
+                    model=self.model,
                     messages=[
                         {
                             "role": "system",
-                            "content": "You are a professional procurement analyst. Generate well-structured, insightful procurement reports. Use clear section headers, professional business language, and focus on actionable insights. Format key metrics as bullet points. Use line breaks between sections for readability."
+                            "content": _SYSTEM_MSG
                         },
                         {
                             "role": "user",
                             "content": prompt
                         }
                     ],
-                    temperature=0.7,
-                    max_tokens=1500,
+                    temperature=_TEMPERATURE,
+                    max_tokens=self.max_tokens,
                     timeout=30
                 )
                 report_text = response.choices[0].message['content']
             
-            # Extract structured sections from the report
-            sections = self._parse_report_sections(report_text)
-            
-            # Prepare metrics for display
-            metrics = self._prepare_metrics(summary)
-            
+            result = self._build_result(summary, report_text)
+            with self._cache_lock:
+                self._cache.set(cache_key, result)
+            return self._stamped(result)
+        
+        except Exception as e:  # pragma: no cover
+            return self._error_result(e)
+    
+    @staticmethod
+    def _error_result(e: Exception) -> Dict[str, Any]:
+        """Map an OpenAI failure to the error response shape."""
+        error_str = str(e).lower()
+        
+        if 'rate limit' in error_str:  # pragma: no cover
+            logger.error(f"OpenAI rate limit exceeded: {str(e)}")
             return {
-                'success': True,
-                'report': report_text,
-                'sections': sections,
-                'metrics': metrics,
-                'summary': summary,
-                'generated_at': datetime.utcnow().isoformat()
+                'success': False,
+                'message': 'AI service is temporarily overloaded. Please try again shortly.',
+                'error': 'rate_limit'
             }
+        elif 'connection' in error_str or 'timeout' in error_str:  # pragma: no cover
+            logger.error(f"OpenAI API connection error: {str(e)}")
+            return {
+                'success': False,
+                'message': 'Unable to connect to AI service. Please check your internet connection.',
+                'error': 'connection_error'
+            }
+        else:  # pragma: no cover
+            logger.error(f"OpenAI API error: {str(e)}")
+            return {
+                'success': False,
+                'message': 'AI service encountered an error. Please try again.',
+                'error': 'api_error'
+            }
+    
+    def generate_procurement_report_stream(self, summary: Dict[str, Any],
+                                           query: str = None) -> Iterator[str]:
+        """
+        Stream a procurement report as text chunks while OpenAI generates it.
         
-        except Exception as e:  # pragma: no cover
-            error_str = str(e).lower()
-            
-            if 'rate limit' in error_str:  # pragma: no cover
-                logger.error(f"OpenAI rate limit exceeded: {str(e)}")
-                return {
-                    'success': False,
-                    'message': 'AI service is temporarily overloaded. Please try again shortly.',
-                    'error': 'rate_limit'
-                }
-            elif 'connection' in error_str or 'timeout' in error_str:  # pragma: no cover
-                logger.error(f"OpenAI API connection error: {str(e)}")
-                return {
-                    'success': False,
-                    'message': 'Unable to connect to AI service. Please check your internet connection.',
-                    'error': 'connection_error'
-                }
-            else:  # pragma: no cover
-                logger.error(f"OpenAI API error: {str(e)}")
-                return {
-                    'success': False,
-                    'message': 'AI service encountered an error. Please try again.',
-                    'error': 'api_error'
+        A cached report is yielded in one chunk. Once the stream completes,
+        the full report is cached like generate_procurement_report() does.
+        OpenAI errors propagate to the caller.
+        """
+        cache_key = self._cache_key(summary, query)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        if cached is not None:
+            yield cached['report']
+            return
+        
+        if not self.use_modern_api:  # pragma: no cover
+            result = self.generate_procurement_report(summary, query)
+            if not result.get('success'):
+                raise RuntimeError(result.get('message', 'AI service unavailable'))
+            yield result['report']
+            return
+        
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": _SYSTEM_MSG},
+                {"role": "user", "content": self._build_prompt(summary, query)}
+            ],
+            temperature=_TEMPERATURE,
+            max_tokens=self.max_tokens,
+            timeout=30,
+            stream=True
+        )
+        
+        parts = []
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                parts.append(text)
+                yield text
+        
+        result = self._build_result(summary, "".join(parts))
+        with self._cache_lock:
+            self._cache.set(cache_key, result)
+    
+    def generate_procurement_reports(self, summaries: List[Dict[str, Any]],
+                                     query: str = None) -> List[Dict[str, Any]]:
+        """
+        Generate reports for several summaries with as few OpenAI requests as possible.
+        
+        Cached reports are reused; the remaining summaries are packed into
+        prompts of as many reports as fit in _BATCH_MAX_TOKENS, and the
+        model returns a JSON list mapped back by index. If a batched call
+        fails or its output does not match, each summary in that group
+        falls back to generate_procurement_report().
+        
+        Returns: one result dict per summary, in input order
+        """
+        results = [None] * len(summaries)
+        pending = []
+        
+        with self._cache_lock:
+            for i, summary in enumerate(summaries):
+                cached = self._cache.get(self._cache_key(summary, query))
+                if cached is not None:
+                    results[i] = self._stamped(cached)
+                else:
+                    pending.append(i)
+        
+        if len(pending) > 1 and self.use_modern_api:
+            # Each group must fit its reports within one completion's token budget
+            group_size = max(1, _BATCH_MAX_TOKENS // self.max_tokens)
+            unbatched = []
+            for start in range(0, len(pending), group_size):
+                group = pending[start:start + group_size]
+                if len(group) == 1:
+                    unbatched.extend(group)
+                    continue
+                try:
+                    texts = self._generate_batch([summaries[i] for i in group], query)
+                    for i, report_text in zip(group, texts):
+                        result = self._build_result(summaries[i], report_text)
+                        with self._cache_lock:
+                            self._cache.set(self._cache_key(summaries[i], query), result)
+                        results[i] = self._stamped(result)
+                except Exception as e:
+                    logger.warning(f"Batched report generation failed, falling back to single calls: {str(e)}")
+                    unbatched.extend(group)
+            pending = unbatched
+        
+        for i in pending:
+            results[i] = self.generate_procurement_report(summaries[i], query)
+        
+        return results
+    
+    def _generate_batch(self, summaries: List[Dict[str, Any]], query: str = None) -> List[str]:
+        """Request all reports in one completion; raises ValueError on malformed output."""
+        blocks = "\n\n".join(
+            f"INPUT[{i}]:\n{self._build_prompt(summary, query)}"
+            for i, summary in enumerate(summaries)
+        )
+        prompt = (
+            f"You will receive {len(summaries)} report requests. "
+            'Return a JSON object {"reports": [...]} where reports[i] is the full '
+            "report text for INPUT[i].\n\n" + blocks
+        )
+        
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": _SYSTEM_MSG},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=_TEMPERATURE,
+            max_tokens=self.max_tokens * len(summaries),
+            response_format={"type": "json_object"},
+            timeout=60
+        )
+        
+        reports = json.loads(response.choices[0].message.content).get("reports")
+        if (not isinstance(reports, list) or len(reports) != len(summaries)
+                or not all(isinstance(r, str) and r.strip() for r in reports)):
+            raise ValueError("Batched response does not contain one report per input")
+        return reports
+    
+    def submit_batch_reports(self, summaries: List[Dict[str, Any]], query: str = None) -> str:
+        """
+        Queue one report per summary on the OpenAI Batch API.
+        
+        For non-interactive jobs (nightly or backfill reports): batch requests
+        cost half as much and don't count against the RPM limit, but complete
+        within 24 hours. Keep the returned batch id and pass it, with the same
+        summaries, to collect_batch().
+        
+        Returns: OpenAI batch id
+        """
+        if not self.use_modern_api:  # pragma: no cover
+            raise RuntimeError("Batch report generation requires openai>=1.0")
+        
+        lines = []
+        for i, summary in enumerate(summaries):
+            lines.append(json.dumps({
+                "custom_id": f"report-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": _SYSTEM_MSG},
+                        {"role": "user", "content": self._build_prompt(summary, query)}
+                    ],
+                    "temperature": _TEMPERATURE,
+                    "max_tokens": self.max_tokens
                 }
+            }))
+        
+        batch_file = self.client.files.create(
+            file=("reports.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"Submitted report batch {batch.id} with {len(summaries)} request(s)")
+        return batch.id
+    
+    def collect_batch(self, batch_id: str, summaries: List[Dict[str, Any]],
+                      query: str = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetch the results of a submit_batch_reports() batch.
+        
+        Returns None while the batch is still running. Once complete, returns
+        one result dict per summary in input order (requests that failed get
+        an error result) and caches the successful reports.
+        Raises RuntimeError if the batch failed, expired or was cancelled.
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in ("failed", "expired", "cancelled"):
+            raise RuntimeError(f"Report batch {batch_id} {batch.status}")
+        if batch.status != "completed":
+            return None
+        
+        texts = {}
+        if batch.output_file_id:
+            for line in self.client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if response.get("status_code") == 200:
+                    texts[entry["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        
+        results = []
+        for i, summary in enumerate(summaries):
+            report_text = texts.get(f"report-{i}")
+            if report_text is None:
+                results.append(self._error_result(RuntimeError(f"batch request report-{i} failed")))
+                continue
+            result = self._build_result(summary, report_text)
+            with self._cache_lock:
+                self._cache.set(self._cache_key(summary, query), result)
+            results.append(self._stamped(result))
+        return results
+    
+    def _build_result(self, summary: Dict[str, Any], report_text: str) -> Dict[str, Any]:
+        """
+        Wrap generated report text with parsed sections and display metrics.
+        
+        This is the cache entry: it has no generated_at and holds its own copy
+        of summary. Callers get it through _stamped().
+        """
+        summary = copy.deepcopy(summary)
+        return {
+            'success': True,
+            'report': report_text,
+            'sections': self._parse_report_sections(report_text),
+            'metrics': self._prepare_metrics(summary),
+            'summary': summary,
+        }
+    
+    @staticmethod
+    def _stamped(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Caller-owned copy of a cached result, with generated_at set to now."""
+        result = copy.deepcopy(entry)
+        result['generated_at'] = datetime.utcnow().isoformat()
+        return result
+    
+    def invalidate(self, summary: Dict[str, Any] = None, query: str = None) -> None:
+        """
+        Drop a cached report so the next call regenerates it.
+        
+        With no summary, the whole report cache is cleared.
+        """
+        with self._cache_lock:
+            if summary is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(self._cache_key(summary, query))
+    
+    @staticmethod
+    def _cache_key(summary: Dict[str, Any], query: str = None) -> str:
+        """Stable hash of the prompt inputs."""
+        payload = json.dumps({'s': summary, 'q': query}, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
     
     @staticmethod
     def _build_prompt(summary: Dict[str, Any], query: str = None) -> str:
@@ -188,33 +560,14 @@ class AIReportGenerator:
             for status, count in status_breakdown.items():
                 status_text += f"\n- {status}: {int(count or 0)}"
         
-        prompt = f"""Generate a professional procurement report for {date_range}.
-
-PROCUREMENT DATA:
-- Total Spending: ${total_spend:,.2f}
-- Total Purchase Orders: {po_count}
-- Pending Orders: {pending_count}
-{status_text}{suppliers_text}
-
-FORMAT REQUIREMENTS:
-1. Create clear section headers in ALL CAPS
-2. Start with "EXECUTIVE SUMMARY" - brief overview of procurement activity
-3. Follow with "KEY METRICS" - use bullet points for key numbers
-4. Continue with "SPENDING ANALYSIS" - analyze spending patterns
-5. Add "SUPPLIER PERFORMANCE" - details about top suppliers
-6. Add "ORDER STATUS REVIEW" - review of order statuses
-7. End with "RECOMMENDATIONS" - actionable insights
-
-STYLE GUIDELINES:
-- Use professional business language
-- Write in clear paragraphs (not bullet points except for metrics)
-- Use line breaks between sections for readability
-- Highlight key insights and potential risks
-- Be concise but thorough
-- Focus on actionable recommendations
-- Format metrics as bullet points with bold labels
-
-Generate a well-structured report following this format."""
+        prompt = _PROMPT_TMPL.substitute(
+            date_range=date_range,
+            total_spend=f"{total_spend:,.2f}",
+            po_count=po_count,
+            pending_count=pending_count,
+            status_text=status_text,
+            suppliers_text=suppliers_text,
+        )
         
         if query:
             prompt += f"\n\nUser context: {query}"
@@ -226,31 +579,40 @@ Generate a well-structured report following this format."""
         """
         Parse the report into logical sections.
         
+        The report is split at the prompt's ALL CAPS headers in one pass;
+        each header's block (header included) goes to its display section.
+        Reports without recognizable headers fall back to paragraphs, with
+        everything after the third paragraph kept in 'recommendation'.
+        
         Args:
             report_text: Full report narrative
         
         Returns:
             Dictionary with parsed sections
         """
-        sections = {
-            'overview': '',
-            'analysis': '',
-            'trends': '',
-            'recommendation': ''
+        parts = {
+            'overview': [],
+            'analysis': [],
+            'trends': [],
+            'recommendation': []
         }
         
-        paragraphs = report_text.split('\n\n')
-        
-        if len(paragraphs) >= 1:
-            sections['overview'] = paragraphs[0]
-        if len(paragraphs) >= 2:
-            sections['analysis'] = paragraphs[1]
-        if len(paragraphs) >= 3:
-            sections['trends'] = paragraphs[2]
-        if len(paragraphs) >= 4:
-            sections['recommendation'] = paragraphs[3]
+        headers = list(_SECTION_HEADER_RE.finditer(report_text))
+        if headers:
+            preamble = report_text[:headers[0].start()].strip()
+            if preamble:
+                parts['overview'].append(preamble)
+            ends = [h.start() for h in headers[1:]] + [len(report_text)]
+            for header, end in zip(headers, ends):
+                block = report_text[header.start():end].strip()
+                parts[_SECTION_FOR_HEADER[header.group(1)]].append(block)
+        else:
+            paragraphs = report_text.split('\n\n')
+            for key, paragraph in zip(('overview', 'analysis', 'trends'), paragraphs):
+                parts[key].append(paragraph)
+            parts['recommendation'].extend(paragraphs[3:])
         
-        return sections
+        return {key: '\n\n'.join(blocks) for key, blocks in parts.items()}
 
     @staticmethod
     def _prepare_metrics(summary: Dict[str, Any]) -> Dict[str, Any]:
@@ -291,3 +653,128 @@ Generate a well-structured report following this format."""
             'status_breakdown': status_breakdown,
             'top_suppliers': top_suppliers
         }
+
+
+def _pooled_http_client():
+    """Keep-alive HTTP pool for the OpenAI client (None uses the SDK default)."""
+    if httpx is None:  # pragma: no cover
+        return None
+    return httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        timeout=30
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_ai_report_generator() -> AIReportGenerator:
+    """
+    Shared AIReportGenerator for request handlers.
+    
+    Reusing one instance keeps TLS connections to OpenAI alive between
+    requests. Construction errors (e.g. a missing API key) are not cached.
+    """
+    return AIReportGenerator()
+
+
+class _AsyncRateLimiter:
+    """Spaces call starts evenly so at most `rate` begin per `period` seconds."""
+    
+    def __init__(self, rate: float, period: float = 60.0):
+        self._interval = period / rate
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = max(0.0, self._next_start - now)
+            self._next_start = max(now, self._next_start) + self._interval
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class AsyncAIReportGenerator(AIReportGenerator):
+    """
+    Async variant for generating many per-summary reports concurrently.
+    
+    Shares the prompt, parsing and report cache of AIReportGenerator, but
+    talks to OpenAI through AsyncOpenAI so calls overlap instead of
+    running back to back.
+    """
+    
+    MAX_ATTEMPTS = 5
+    MAX_BACKOFF = 30.0
+    
+    def __init__(self):
+        """Initialize AsyncOpenAI client from environment variable."""
+        api_key = self._load_settings()
+        if AsyncOpenAI is None:
+            raise RuntimeError("Async report generation requires openai>=1.0")
+        
+        self.client = AsyncOpenAI(api_key=api_key)
+        self.use_modern_api = True
+    
+    async def agenerate_procurement_report(self, summary: Dict[str, Any],
+                                           query: str = None) -> Dict[str, Any]:
+        """Async counterpart of generate_procurement_report(); same return shape."""
+        cache_key = self._cache_key(summary, query)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        if cached is not None:
+            return self._stamped(cached)
+        
+        try:
+            response = await self._create_with_retry(self._build_prompt(summary, query))
+            result = self._build_result(summary, response.choices[0].message.content)
+            with self._cache_lock:
+                self._cache.set(cache_key, result)
+            return self._stamped(result)
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def arun_many(self, summaries: List[Dict[str, Any]], queries: List[str] = None,
+                        max_concurrency: int = 8, rpm: int = 500) -> List[Any]:
+        """
+        Generate one report per summary concurrently.
+        
+        At most max_concurrency calls are in flight and at most rpm start per
+        minute. Results are returned in submission order; an unexpected
+        exception is returned in place of its result.
+        
+        Raises ValueError if queries is given with a different length than summaries.
+        """
+        if queries is None:
+            queries = [None] * len(summaries)
+        elif len(queries) != len(summaries):
+            raise ValueError(f"Got {len(queries)} queries for {len(summaries)} summaries")
+        semaphore = asyncio.Semaphore(max_concurrency)
+        limiter = _AsyncRateLimiter(rpm, 60.0)
+        
+        async def run_one(summary, query):
+            async with semaphore:
+                await limiter.acquire()
+                return await self.agenerate_procurement_report(summary, query)
+        
+        return await asyncio.gather(
+            *(run_one(summary, query) for summary, query in zip(summaries, queries)),
+            return_exceptions=True
+        )
+    
+    async def _create_with_retry(self, prompt: str):
+        """Call chat completions, retrying rate-limit errors with jittered backoff."""
+        for attempt in range(self.MAX_ATTEMPTS):
+            try:
+                return await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": _SYSTEM_MSG},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=_TEMPERATURE,
+                    max_tokens=self.max_tokens,
+                    timeout=30
+                )
+            except RateLimitError:
+                if attempt == self.MAX_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(random.uniform(0, min(self.MAX_BACKOFF, 2 ** attempt)))
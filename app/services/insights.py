@@ -5,7 +5,7 @@ Analyzes purchase order data and generates actionable metrics and recommendation
 """
 
 from typing import Dict, List, Any, Tuple
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 
 # ============================================================================
@@ -69,10 +69,15 @@ def _extract_spend_by_supplier(  # pragma: no cover
         Dict mapping supplier name to total spend
     """
     supplier_spend = defaultdict(float)
+    _isinstance, _float = isinstance, float
     for po in purchase_orders:
         supplier = po.get("supplier", "Unknown Supplier")
-        amount = _safe_float(po.get("grand_total"))
-        supplier_spend[supplier] += amount
+        value = po.get("grand_total")
+        # Numbers are the common case; only fall back to the guarded
+        # conversion for strings/None
+        supplier_spend[supplier] += (
+            _float(value) if _isinstance(value, (int, float)) else _safe_float(value)
+        )
     return dict(supplier_spend)
 
 
@@ -87,11 +92,7 @@ def _extract_counts_by_status(  # pragma: no cover
     Returns:
         Dict mapping status to count
     """
-    status_counts = defaultdict(int)
-    for po in purchase_orders:
-        status = po.get("status", "Unknown")
-        status_counts[status] += 1
-    return dict(status_counts)
+    return dict(Counter(po.get("status", "Unknown") for po in purchase_orders))
 
 
 def _get_top_suppliers(  # pragma: no cover
@@ -287,7 +288,11 @@ def build_purchase_order_insights(
 
     # Compute basic metrics
     total_orders = len(purchase_orders)
-    total_spend = sum(_safe_float(po.get("grand_total")) for po in purchase_orders)
+    total_spend = 0.0
+    _isinstance, _float = isinstance, float
+    for po in purchase_orders:
+        value = po.get("grand_total")
+        total_spend += _float(value) if _isinstance(value, (int, float)) else _safe_float(value)
     average_order_value = total_spend / total_orders if total_orders > 0 else 0.0
 
     # Compute derived metrics
@@ -1,4 +1,12 @@
 """PDF export utilities for copilot responses"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
@@ -7,11 +15,191 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
-from typing import Any, Dict, List
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from app.config import PDF_BACKEND, PDF_CACHE_DIR, PDF_CACHE_TTL, PDF_RENDER_WORKERS
+
+try:
+    from weasyprint import HTML
+except ImportError:  # Optional: only needed for PDF_BACKEND=weasyprint
+    HTML = None
+
+# Rows per Table flowable; large lists are split so ReportLab never lays out one huge table
+_TABLE_CHUNK_ROWS = 500
+
+# Shared by every table; TableStyle is read-only once built
+_HEADER_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e0e0e0')),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+    ('TOPPADDING', (0, 1), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+])
+
+_ANOMALY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f44')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e0e0e0')),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#fff0f0')]),
+])
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Same directory as app.main.TEMPLATES_DIR (importing app.main here would be circular)
+_TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+_jinja = Environment(
+    loader=FileSystemLoader(_TEMPLATES_DIR),
+    autoescape=select_autoescape(["html"]),
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
 
 
 def generate_pdf_report(data: Any, intent: str, title: str = "ERPNext Copilot Report") -> bytes:
-    """Generate a PDF report from data."""
+    """
+    Generate a PDF report from data.
+    
+    With PDF_RENDER_WORKERS > 0 rendering runs in a worker process so it
+    doesn't hold the GIL in the request thread. With PDF_CACHE_DIR set the
+    bytes are cached on disk, keyed by a hash of (data, intent, title), for
+    PDF_CACHE_TTL seconds. Both are off by default.
+    
+    PDF_BACKEND=weasyprint renders the report.html template with WeasyPrint
+    when it is installed; otherwise ReportLab is used.
+    """
+    backend = "weasyprint" if PDF_BACKEND == "weasyprint" and HTML is not None else "reportlab"
+    render = generate_pdf_report_html if backend == "weasyprint" else _render_pdf_report
+    path = _cache_path(data, intent, title, backend)
+    pdf_bytes = _read_cached(path)
+    if pdf_bytes is None:
+        pdf_bytes = _render_in_pool(render, data, intent, title)
+        _write_cached(path, pdf_bytes)
+    return pdf_bytes
+
+
+def _render_in_pool(render, data: Any, intent: str, title: str) -> bytes:
+    """Render in the process pool, or inline when PDF_RENDER_WORKERS is 0."""
+    global _pool
+    if PDF_RENDER_WORKERS <= 0:
+        return render(data, intent, title)
+    
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_RENDER_WORKERS)
+        pool = _pool
+    try:
+        return pool.submit(render, data, intent, title).result()
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool next time and render this one inline
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        return render(data, intent, title)
+
+
+def _cache_path(data: Any, intent: str, title: str, backend: str) -> Optional[str]:
+    """On-disk cache file for a report, or None when caching is disabled."""
+    if not PDF_CACHE_DIR:
+        return None
+    payload = json.dumps([data, intent, title, backend], sort_keys=True, default=str)
+    key = hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(PDF_CACHE_DIR, f"{key}.pdf")
+
+
+def _read_cached(path: Optional[str]) -> Optional[bytes]:
+    """Cached PDF bytes if the file exists and is younger than PDF_CACHE_TTL."""
+    if path is None:
+        return None
+    try:
+        if time.time() - os.path.getmtime(path) >= PDF_CACHE_TTL:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_cached(path: Optional[str], pdf_bytes: bytes) -> None:
+    """Write a cache file atomically; caching is best effort."""
+    if path is None:
+        return
+    try:
+        os.makedirs(PDF_CACHE_DIR, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def generate_pdf_report_html(data: Any, intent: str, title: str = "ERPNext Copilot Report") -> bytes:
+    """Render a PDF report from data with the report.html template and WeasyPrint."""
+    if HTML is None:
+        raise RuntimeError("WeasyPrint is not installed; install it or use PDF_BACKEND=reportlab")
+    return HTML(string=render_report_html(data, intent, title)).write_pdf()
+
+
+def render_report_html(data: Any, intent: str, title: str = "ERPNext Copilot Report") -> str:
+    """Render the report.html template for data (the HTML fed to WeasyPrint)."""
+    context = {
+        "title": title,
+        "intent": intent,
+        "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "table": None,
+        "sections": None,
+        "text": None,
+    }
+    
+    if isinstance(data, list):
+        context["table"] = _html_table(data)
+    elif isinstance(data, dict):
+        sections = []
+        for key, value in data.items():
+            section = {"title": key, "table": None, "lines": []}
+            if isinstance(value, dict):
+                section["lines"] = [(k, _format_cell_value(v)) for k, v in value.items()]
+            elif isinstance(value, list):
+                if value and isinstance(value[0], dict):
+                    section["table"] = _html_table(value)
+                else:
+                    section["lines"] = [(None, f"• {_format_cell_value(item)}") for item in value]
+            else:
+                section["lines"] = [(None, _format_cell_value(value))]
+            sections.append(section)
+        context["sections"] = sections
+    else:
+        context["text"] = str(data)
+    
+    return _jinja.get_template("report.html").render(context)
+
+
+def _html_table(data: List[Dict]) -> Optional[Dict[str, Any]]:
+    """Columns and lazily formatted rows for the template, or None for an empty list."""
+    if not data:
+        return None
+    columns, rows = _table_rows(data)
+    return {"columns": columns, "rows": rows}
+
+
+def _render_pdf_report(data: Any, intent: str, title: str = "ERPNext Copilot Report") -> bytes:
+    """Render a PDF report from data with ReportLab."""
     buffer = BytesIO()
     doc = SimpleDocTemplate(
         buffer,
@@ -77,44 +265,43 @@ def _render_list_as_table(data: List[Dict], styles) -> List:
         elements.append(Paragraph("No data to display.", styles['Normal']))
         return elements
     
-    # Get all unique keys
+    columns, rows = _table_rows(data)
+    col_widths = [7.5*inch / len(columns)] * len(columns)
+    
+    # Emit one table per chunk, each with the header row
+    while True:
+        chunk = list(islice(rows, _TABLE_CHUNK_ROWS))
+        if not chunk:
+            break
+        table = Table([columns] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(_HEADER_TABLE_STYLE)
+        elements.append(table)
+    
+    return elements
+
+
+def _table_rows(data: List[Dict]):
+    """
+    Sorted column names and a lazy iterator of formatted rows for a list of dicts.
+    
+    Each column's formatter is picked from its first non-null value.
+    """
     all_keys = set()
+    samples = {}
     for item in data:
         if isinstance(item, dict):
             all_keys.update(item.keys())
+            for key, value in item.items():
+                if value is not None and key not in samples:
+                    samples[key] = value
     
     columns = sorted(list(all_keys))
-    
-    # Build table data
-    table_data = [columns]  # Header row
-    
-    for item in data:
-        if isinstance(item, dict):
-            row = [_format_cell_value(item.get(col, '')) for col in columns]
-            table_data.append(row)
-        else:
-            table_data.append([str(item)])
-    
-    # Create table
-    table = Table(table_data, colWidths=[7.5*inch / len(columns)] * len(columns))
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e0e0e0')),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-        ('TOPPADDING', (0, 1), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-    ]))
-    
-    elements.append(table)
-    return elements
+    formatters = [_pick_formatter(samples.get(col)) for col in columns]
+    rows = (
+        [fmt(item.get(col, '')) for col, fmt in zip(columns, formatters)] if isinstance(item, dict) else [str(item)]
+        for item in data
+    )
+    return columns, rows
 
 
 def _render_dict_as_section(data: Dict, styles) -> List:
@@ -123,25 +310,25 @@ def _render_dict_as_section(data: Dict, styles) -> List:
     
     for key, value in data.items():
         # Section title
-        title = Paragraph(f"<b>{key}</b>", styles['Heading3'])
+        title = Paragraph(f"<b>{escape(str(key))}</b>", styles['Heading3'])
         elements.append(title)
         
-        # Section content
+        # Section content: one Paragraph per section with <br/> between lines,
+        # values escaped so they are never parsed as markup
         if isinstance(value, dict):
-            for k, v in value.items():
-                para = Paragraph(f"<b>{k}:</b> {_format_cell_value(v)}", styles['Normal'])
-                elements.append(para)
+            if value:
+                lines = [f"<b>{escape(str(k))}:</b> {escape(_format_cell_value(v))}" for k, v in value.items()]
+                elements.append(Paragraph("<br/>".join(lines), styles['Normal']))
         elif isinstance(value, list):
             if value and isinstance(value[0], dict):
                 # Render as table
                 elements.extend(_render_list_as_table(value, styles))
-            else:
+            elif value:
                 # Render as bullet points
-                for item in value:
-                    para = Paragraph(f"• {_format_cell_value(item)}", styles['Normal'])
-                    elements.append(para)
+                lines = [f"• {escape(_format_cell_value(item))}" for item in value]
+                elements.append(Paragraph("<br/>".join(lines), styles['Normal']))
         else:
-            para = Paragraph(_format_cell_value(value), styles['Normal'])
+            para = Paragraph(escape(_format_cell_value(value)), styles['Normal'])
             elements.append(para)
         
         elements.append(Spacer(1, 0.2*inch))
@@ -165,6 +352,46 @@ def _format_cell_value(value: Any) -> str:
         return str(value)[:100]  # Truncate long strings
 
 
+def _fmt_num(value: Any) -> str:
+    return str(value) if type(value) in (int, float) else _format_cell_value(value)
+
+
+def _fmt_bool(value: Any) -> str:
+    if value is True:
+        return "Yes"
+    if value is False:
+        return "No"
+    return _format_cell_value(value)
+
+
+def _fmt_list_short(value: Any) -> str:
+    if type(value) is list:
+        return ", ".join([str(v) for v in value[:5]]) + ("..." if len(value) > 5 else "")
+    return _format_cell_value(value)
+
+
+def _fmt_str100(value: Any) -> str:
+    return value[:100] if type(value) is str else _format_cell_value(value)
+
+
+def _pick_formatter(sample: Any):
+    """
+    Choose a column formatter from a sample value.
+    
+    Each formatter has a fast path for its own type and falls back to
+    _format_cell_value(), so mixed columns format exactly as before.
+    """
+    if isinstance(sample, bool):
+        return _fmt_bool
+    if isinstance(sample, (int, float)):
+        return _fmt_num
+    if isinstance(sample, list):
+        return _fmt_list_short
+    if isinstance(sample, str):
+        return _fmt_str100
+    return _format_cell_value
+
+
 def add_anomaly_section(data: Dict, styles) -> List:
     """Special rendering for price anomaly data."""
     elements = []
@@ -188,15 +415,7 @@ def add_anomaly_section(data: Dict, styles) -> List:
                 ])
             
             table = Table(table_data, colWidths=[1.2*inch, 1.2*inch, 1*inch, 1*inch, 1*inch, 0.8*inch])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f44')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e0e0e0')),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#fff0f0')]),
-            ]))
+            table.setStyle(_ANOMALY_TABLE_STYLE)
             elements.append(table)
         else:
             elements.append(Paragraph("No price anomalies detected.", styles['Normal']))
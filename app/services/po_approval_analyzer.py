@@ -7,82 +7,323 @@ Analyzes POs to recommend APPROVE/REVIEW/DO NOT APPROVE decisions based on:
 3. Missing data validation
 """
 
-from typing import Dict, List, Any, Tuple
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Tuple
+import requests
 from app.models.erp_client import ERPNextClient
+from app.services import rate_cache
+
+_CLOSED_STATUSES = frozenset({'Completed', 'Cancelled'})
+_EXCLUDED_HISTORY_STATUSES = frozenset({'Draft', 'Cancelled', 'Amended'})
+
+# Line-item rows fetched for historical rates (one row per PO item)
+_HISTORY_ROWS = 500
+_HISTORY_FIELDS = [
+    "name",
+    "supplier",
+    "`tabPurchase Order Item`.item_code as item_code",
+    "`tabPurchase Order Item`.rate as rate",
+]
+
+logger = logging.getLogger(__name__)
+
+# Failures expected from ERPNext requests and their (possibly malformed) payloads
+_ERP_ERRORS = (requests.RequestException, KeyError, ValueError, TypeError, AttributeError)
+
+# Lookup results (and failures) are reused for this long, so a degraded
+# ERPNext is not hit again on every analysis. Successful open-order counts
+# and rates are cached too: a bulk approval run asks for the same supplier
+# many times, and a count up to 30 s old is fine for a recommendation.
+_LOOKUP_TTL = 30
+_LOOKUP_MAXSIZE = 1024
+_lookup_cache: "OrderedDict[tuple, Tuple[float, Any]]" = OrderedDict()
+_lookup_lock = threading.Lock()
+# When the last full rate-history fetch failed (0.0 if it has not)
+_rate_history_failed_at = 0.0
+
+
+# Background rate-cache warm-ups are skipped if one ran this recently
+_PREFETCH_INTERVAL = 60
+_prefetch_lock = threading.Lock()
+_last_prefetch = 0.0
+
+
+class TransientERPError(Exception):
+    """An ERPNext lookup failed; callers may retry later or degrade gracefully."""
+
+
+def clear_lookup_cache() -> None:
+    """Forget cached open-order counts, item rates and ERPNext failures."""
+    global _rate_history_failed_at
+    with _lookup_lock:
+        _lookup_cache.clear()
+        _rate_history_failed_at = 0.0
+
+
+def _cached_lookup(key: tuple, fetch: Callable[[], Any]) -> Any:
+    """
+    Return fetch() for key, calling ERPNext at most once per _LOOKUP_TTL.
+    
+    Failures are cached too and re-raised as TransientERPError until they expire.
+    """
+    now = time.monotonic()
+    with _lookup_lock:
+        hit = _lookup_cache.get(key)
+    
+    if hit is not None and now - hit[0] < _LOOKUP_TTL:
+        value = hit[1]
+    else:
+        try:
+            value = fetch()
+        except _ERP_ERRORS as e:
+            logger.warning(f"ERPNext lookup {key[0]} failed: {e}")
+            value = TransientERPError(f"ERPNext lookup failed: {e}")
+        with _lookup_lock:
+            _lookup_cache[key] = (now, value)
+            _lookup_cache.move_to_end(key)
+            while len(_lookup_cache) > _LOOKUP_MAXSIZE:
+                _lookup_cache.popitem(last=False)
+    
+    if isinstance(value, TransientERPError):
+        raise TransientERPError(*value.args)
+    return value
 
 
 def get_supplier_open_orders(client: ERPNextClient, supplier: str) -> int:
-    """Count open purchase orders for a supplier."""
+    """
+    Count open purchase orders for a supplier.
+    
+    Raises TransientERPError if ERPNext cannot be queried.
+    """
+    def fetch():
+        rows = client.list_purchase_orders(
+            limit=0,
+            filters=[["supplier", "=", supplier], ["status", "not in", sorted(_CLOSED_STATUSES)]],
+            fields=["name"],
+        )
+        return len(rows or [])
+    
+    return _cached_lookup(('open_orders', supplier), fetch)
+
+
+def _open_orders_or_zero(client: ERPNextClient, supplier: str) -> int:
+    """get_supplier_open_orders(), treating an unreachable ERPNext as no open orders."""
     try:
-        pos = client.list_purchase_orders(limit=100)
-        if not pos:
-            return 0
-        
-        open_count = sum(1 for p in pos 
-                        if p.get('supplier') == supplier 
-                        and p.get('status') not in ['Completed', 'Cancelled'])
-        return open_count
-    except:
+        return get_supplier_open_orders(client, supplier)
+    except TransientERPError:
         return 0
 
 
+def _open_orders_by_supplier(client: ERPNextClient) -> Counter:
+    """Count open purchase orders for every supplier in one filtered request."""
+    try:
+        rows = client.list_purchase_orders(
+            limit=0,
+            filters=[["status", "not in", sorted(_CLOSED_STATUSES)]],
+            fields=["supplier"],
+        )
+    except _ERP_ERRORS as e:
+        logger.warning(f"ERPNext open-order lookup failed: {e}")
+        return Counter()
+    return Counter(row.get('supplier') for row in rows or [])
+
+
+def _fetch_rate_history(client: ERPNextClient, item_code: str = None, supplier: str = None) -> List[Dict[str, Any]]:
+    """
+    Fetch past PO line items (supplier, item_code, rate) for rate averaging.
+    
+    Status, supplier and item filters are applied by ERPNext, so only the
+    relevant child rows cross the wire.
+    """
+    filters = [["status", "not in", sorted(_EXCLUDED_HISTORY_STATUSES)]]
+    if supplier:
+        filters.append(["supplier", "=", supplier])
+    if item_code:
+        filters.append(["Purchase Order Item", "item_code", "=", item_code])
+    return client.list_purchase_orders(limit=_HISTORY_ROWS, filters=filters, fields=_HISTORY_FIELDS) or []
+
+
 def get_historical_item_rate(client: ERPNextClient, item_code: str, supplier: str = None) -> Tuple[float, int]:
     """
     Get historical average rate for an item from past purchase orders.
     
     Returns: (average_rate, count_of_orders)
+    Raises TransientERPError if ERPNext cannot be queried.
     """
-    try:
-        pos = client.list_purchase_orders(limit=100)
-        if not pos:
+    def fetch():
+        rows = _fetch_rate_history(client, item_code, supplier)
+        if not rows:
             return 0.0, 0
-        
-        matching_rates = []
-        
-        for po in pos:
-            # Skip draft/cancelled orders
-            if po.get('status') in ['Draft', 'Cancelled', 'Amended']:
-                continue
-            
-            # Filter by supplier if provided
-            if supplier and po.get('supplier') != supplier:
+        return _lookup_rate(_build_rate_index(rows), item_code, supplier)
+    
+    return _cached_lookup(('item_rate', item_code, supplier), fetch)
+
+
+def _build_rate_index(pos: List[Dict[str, Any]]) -> Tuple[Dict[Tuple[str, str], List[float]], Dict[str, List[float]]]:
+    """
+    Index historical item rates in one pass over past purchase orders.
+    
+    Accepts full POs with an 'items' list or flat line-item rows as
+    returned by _fetch_rate_history().
+    
+    Returns: ({(supplier, item_code): [rates]}, {item_code: [rates]})
+    Draft/cancelled/amended orders and non-positive rates are skipped.
+    """
+    by_supplier_item = defaultdict(list)
+    by_item = defaultdict(list)
+    
+    for po in pos or []:
+        if po.get('status') in _EXCLUDED_HISTORY_STATUSES:
+            continue
+        items = po.get('items') or ([po] if 'item_code' in po else None)
+        if not items:
+            continue
+        supplier = po.get('supplier')
+        for item in items:
+            try:
+                rate = float(item.get('rate') or 0)
+            except (TypeError, ValueError):
                 continue
-            
-            # Look for the item in this PO
-            if po.get('items'):
-                for item in po['items']:
-                    if item.get('item_code') == item_code:
-                        rate = float(item.get('rate') or 0)
-                        if rate > 0:
-                            matching_rates.append(rate)
-        
-        if not matching_rates:
-            return 0.0, 0
-        
-        avg_rate = sum(matching_rates) / len(matching_rates)
-        return avg_rate, len(matching_rates)
-    except:
+            if rate > 0:
+                item_code = item.get('item_code')
+                by_supplier_item[(supplier, item_code)].append(rate)
+                by_item[item_code].append(rate)
+    
+    return by_supplier_item, by_item
+
+
+def _lookup_rate(index, item_code: str, supplier: str = None) -> Tuple[float, int]:
+    """Average rate and sample count for an item, filtered by supplier when given."""
+    by_supplier_item, by_item = index
+    rates = by_supplier_item.get((supplier, item_code)) if supplier else by_item.get(item_code)
+    if not rates:
         return 0.0, 0
+    return _rate_stats(rates)
+
+
+def _rate_stats(rates: List[float]) -> Tuple[float, int]:
+    """(average_rate, count) for a non-empty list of rates, using exact float summation."""
+    return math.fsum(rates) / len(rates), len(rates)
 
 
 def calculate_price_anomalies(client: ERPNextClient, po: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Check each item in PO for price anomalies.
     
+    Historical averages come from rate_cache; purchase history is fetched
+    from ERPNext and indexed (once per PO, not per item) only when some
+    item is missing from the cache.
+    
     Returns list of anomalies: {item_code, rate, avg_rate, delta%, is_anomaly}
     """
-    anomalies = []
-    supplier = po.get('supplier', '')
-    
     if not po.get('items'):
-        return anomalies
+        return []
+    return _price_checks(po, _historical_rates(client, _rate_keys(po)))
+
+
+def _rate_history_index(client: ERPNextClient):
+    """
+    _build_rate_index() over the full rate history.
     
-    for item in po['items']:
+    A failed fetch is remembered for _LOOKUP_TTL and raised as
+    TransientERPError without calling ERPNext again, so an outage costs
+    one history request per TTL instead of one per analysis. Successes
+    are not kept here; rate_cache holds their results.
+    """
+    global _rate_history_failed_at
+    now = time.monotonic()
+    with _lookup_lock:
+        failed_at = _rate_history_failed_at
+    if failed_at and now - failed_at < _LOOKUP_TTL:
+        raise TransientERPError("ERPNext rate history lookup failed recently")
+    
+    try:
+        return _build_rate_index(_fetch_rate_history(client))
+    except _ERP_ERRORS as e:
+        logger.warning(f"ERPNext lookup rate_history failed: {e}")
+        with _lookup_lock:
+            _rate_history_failed_at = now
+        raise TransientERPError(f"ERPNext lookup failed: {e}") from e
+
+
+def _rate_keys(po: Dict[str, Any]) -> set:
+    """rate_cache keys for each line item of a PO."""
+    cache_supplier = po.get('supplier', '') or rate_cache.ALL_SUPPLIERS
+    return {(cache_supplier, item.get('item_code')) for item in po.get('items') or []}
+
+
+def _historical_rates(client: ERPNextClient, keys: set) -> Dict[Tuple[str, str], Tuple[float, int]]:
+    """Look up (avg_rate, count) for each key, refreshing the cache on misses."""
+    historical = rate_cache.get_many(keys)
+    if len(historical) == len(keys):
+        return historical
+    
+    try:
+        index = _rate_history_index(client)
+    except TransientERPError:
+        return historical
+    
+    entries = _rate_entries(index)
+    # Remember items with no history too, so they don't force a refetch
+    for key in keys:
+        entries.setdefault(key, (0.0, 0))
+    rate_cache.put_many({k: v for k, v in entries.items() if None not in k})
+    return {key: entries[key] for key in keys}
+
+
+def _rate_entries(index) -> Dict[Tuple[str, str], Tuple[float, int]]:
+    """rate_cache entries for a rate index, per supplier and across all suppliers."""
+    by_supplier_item, by_item = index
+    entries = {key: _rate_stats(r) for key, r in by_supplier_item.items()}
+    entries.update(
+        ((rate_cache.ALL_SUPPLIERS, code), _rate_stats(r)) for code, r in by_item.items()
+    )
+    return entries
+
+
+def prefetch_rates(client: ERPNextClient) -> bool:
+    """
+    Warm rate_cache with historical averages for every item.
+    
+    Meant to run in the background when the PO queue is opened, so the
+    first approval analysis doesn't wait for the history fetch. Runs at
+    most once per _PREFETCH_INTERVAL seconds across all callers.
+    
+    Returns: True if the cache was refreshed
+    """
+    global _last_prefetch
+    now = time.monotonic()
+    with _prefetch_lock:
+        if _last_prefetch and now - _last_prefetch < _PREFETCH_INTERVAL:
+            return False
+        _last_prefetch = now
+    
+    try:
+        index = _rate_history_index(client)
+    except TransientERPError:
+        return False
+    
+    rate_cache.put_many({k: v for k, v in _rate_entries(index).items() if None not in k})
+    return True
+
+
+def _price_checks(po: Dict[str, Any], historical: Dict[Tuple[str, str], Tuple[float, int]]) -> List[Dict[str, Any]]:
+    """Compare each PO line rate against its historical average."""
+    anomalies = []
+    cache_supplier = po.get('supplier', '') or rate_cache.ALL_SUPPLIERS
+    
+    for item in po.get('items') or []:
         item_code = item.get('item_code')
         current_rate = float(item.get('rate') or 0)
         
         # Get historical average
-        avg_rate, count = get_historical_item_rate(client, item_code, supplier)
+        avg_rate, count = historical.get((cache_supplier, item_code), (0.0, 0))
         
         # Calculate delta
         if avg_rate > 0:
@@ -116,22 +357,107 @@ def analyze_po_approval(po_name: str, client: ERPNextClient) -> Dict[str, Any]:
     try:
         po = client.get_purchase_order(po_name)
     except Exception as e:
-        return {
-            'decision': 'REVIEW',
-            'summary': f'Error fetching PO: {str(e)}',
-            'findings': [f'Could not fetch PO details: {str(e)}'],
-            'evidence': [],
-            'next_actions': ['Verify PO name is correct', 'Check system connectivity']
-        }
+        return _fetch_error(e)
+    
+    if not po:
+        return _not_found(po_name)
+    
+    anomalies = calculate_price_anomalies(client, po)
+    open_orders = _open_orders_or_zero(client, po.get('supplier', 'Unknown'))
+    return _score_po(po, anomalies, open_orders)
+
+
+async def a_analyze_po_approval(po_name: str, client: ERPNextClient) -> Dict[str, Any]:
+    """
+    Async analyze_po_approval().
+    
+    Once the PO is fetched (it names the supplier and items), the rate
+    history and open-order requests run concurrently, so the analysis
+    costs two ERPNext round trips instead of three.
+    
+    Returns: {decision, summary, findings, evidence, next_actions}
+    """
+    try:
+        po = await asyncio.to_thread(client.get_purchase_order, po_name)
+    except Exception as e:
+        return _fetch_error(e)
     
     if not po:
-        return {
-            'decision': 'REVIEW',
-            'summary': f'PO {po_name} not found',
-            'findings': ['PO does not exist in system'],
-            'evidence': [],
-            'next_actions': ['Verify PO name', 'Create PO if needed']
-        }
+        return _not_found(po_name)
+    
+    anomalies, open_orders = await asyncio.gather(
+        asyncio.to_thread(calculate_price_anomalies, client, po),
+        asyncio.to_thread(_open_orders_or_zero, client, po.get('supplier', 'Unknown')),
+    )
+    return _score_po(po, anomalies, open_orders)
+
+
+def analyze_pos_bulk(po_names: List[str], client: ERPNextClient, max_workers: int = 8) -> List[Dict[str, Any]]:
+    """
+    Analyze a queue of POs, sharing one history fetch and rate index.
+    
+    PO details are fetched concurrently; rate history (on cache misses) and
+    open-order counts per supplier are each fetched once for the whole queue.
+    
+    Returns: one analyze_po_approval()-shaped result per name, in order
+    """
+    if not po_names:
+        return []
+    
+    def fetch(po_name):
+        try:
+            return client.get_purchase_order(po_name), None
+        except Exception as e:
+            return None, e
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(po_names))) as executor:
+        fetched = list(executor.map(fetch, po_names))
+    
+    open_by_supplier = _open_orders_by_supplier(client)
+    
+    keys = set()
+    for po, _ in fetched:
+        if po:
+            keys |= _rate_keys(po)
+    historical = _historical_rates(client, keys) if keys else {}
+    
+    results = []
+    for po_name, (po, error) in zip(po_names, fetched):
+        if error is not None:
+            results.append(_fetch_error(error))
+        elif not po:
+            results.append(_not_found(po_name))
+        else:
+            anomalies = _price_checks(po, historical)
+            open_orders = open_by_supplier.get(po.get('supplier', 'Unknown'), 0)
+            results.append(_score_po(po, anomalies, open_orders))
+    return results
+
+
+def _fetch_error(e: Exception) -> Dict[str, Any]:
+    """Result returned when a PO cannot be fetched."""
+    return {
+        'decision': 'REVIEW',
+        'summary': f'Error fetching PO: {str(e)}',
+        'findings': [f'Could not fetch PO details: {str(e)}'],
+        'evidence': [],
+        'next_actions': ['Verify PO name is correct', 'Check system connectivity']
+    }
+
+
+def _not_found(po_name: str) -> Dict[str, Any]:
+    """Result returned when a PO does not exist."""
+    return {
+        'decision': 'REVIEW',
+        'summary': f'PO {po_name} not found',
+        'findings': ['PO does not exist in system'],
+        'evidence': [],
+        'next_actions': ['Verify PO name', 'Create PO if needed']
+    }
+
+
+def _score_po(po: Dict[str, Any], anomalies: List[Dict[str, Any]], open_orders: int) -> Dict[str, Any]:
+    """Turn price checks and supplier open-order count into an approval decision."""
     
     # Build summary
     supplier = po.get('supplier', 'Unknown')
@@ -142,13 +468,8 @@ def analyze_po_approval(po_name: str, client: ERPNextClient) -> Dict[str, Any]:
     
     summary = f"Supplier: {supplier} | Status: {status} | Total: {total:,.0f} ILS | Items: {items_count} | Date: {date}"
     
-    # Analyze price anomalies
-    anomalies = calculate_price_anomalies(client, po)
     anomaly_items = [a for a in anomalies if a['is_anomaly']]
     
-    # Check supplier risk
-    open_orders = get_supplier_open_orders(client, supplier)
-    
     # Build findings
     findings = []
     risk_score = 0
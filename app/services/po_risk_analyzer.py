@@ -4,13 +4,45 @@ Purchase Order Risk Assessment Analyzer
 Evaluates PO risk based on:
 1. Order Status (Completed vs Pending)
 2. Price Risk (anomalies, high amounts)
-3. Supplier Risk (open orders, delays)
+3. Supplier Risk (open orders)
 4. Data Completeness (missing receipts/invoices)
 """
 
+import sys
 from typing import Dict, List, Any
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
+# Risk levels as small ints so hot loops compare integers, not emoji strings
+HIGH, MEDIUM, LOW = 2, 1, 0
+
+RISK_LABELS = {
+    HIGH: "🔴 High Risk",
+    MEDIUM: "🟡 Medium Risk",
+    LOW: "🟢 Low Risk",
+}
+
+# Keys are interned so lookups with interned PO statuses match on identity
+
+# Completeness score/reason for the standard ERPNext PO statuses
+_STATUS_COMPLETENESS = {
+    sys.intern("To Receive and Bill"): (8, "Awaiting goods receipt"),
+    sys.intern("To Receive"): (8, "Awaiting goods receipt"),
+    sys.intern("To Bill"): (8, "Awaiting supplier invoice"),
+    sys.intern("Draft"): (0, ""),
+    sys.intern("On Hold"): (0, ""),
+    sys.intern("Delivered"): (0, ""),
+    sys.intern("Completed"): (0, ""),
+    sys.intern("Cancelled"): (0, ""),
+    sys.intern("Closed"): (0, ""),
+}
+
+# Status risk for statuses whose score does not depend on the PO age
+_STATUS_RISK = {
+    sys.intern("Completed"): (0, ""),
+    sys.intern("Cancelled"): (5, "Order cancelled (low risk)"),
+}
+
 
 def analyze_po_risks(pos: List[Dict], client=None) -> Dict[str, Any]:
     """
@@ -50,14 +82,22 @@ def analyze_po_risks(pos: List[Dict], client=None) -> Dict[str, Any]:
     medium_risk_count = 0
     low_risk_count = 0
     
+    # Extract the fields the aggregates need once, then precompute supplier
+    # aggregates so each PO is scored in O(1)
+    # The wall clock is read once so every PO is aged against the same instant
+    now = datetime.now()
+    columns = pos_to_columns(pos, now)
+    ctx = _index_orders(columns)
+    
     # Analyze each PO
-    for po in pos:
-        assessment = evaluate_po_risk(po, pos, client)
+    for po, days_pending in zip(pos, columns.days_pending):
+        assessment = evaluate_po_risk(po, ctx, client, days_pending)
         risk_assessments.append(assessment)
         
-        if "🔴" in assessment["risk_level"]:
+        level = assessment["risk_level_id"]
+        if level == HIGH:
             high_risk_count += 1
-        elif "🟡" in assessment["risk_level"]:
+        elif level == MEDIUM:
             medium_risk_count += 1
         else:
             low_risk_count += 1
@@ -75,10 +115,85 @@ def analyze_po_risks(pos: List[Dict], client=None) -> Dict[str, Any]:
     }
 
 
-def evaluate_po_risk(po: Dict, all_pos: List[Dict], client=None) -> Dict[str, Any]:
+@dataclass
+class RiskContext:
+    """Analysis-wide values shared by every PO evaluation."""
+    average: float
+    open_by_supplier: Dict[str, int]
+
+
+@dataclass
+class POColumns:
+    """Column-wise view of a PO list: one list per field, aligned by index."""
+    supplier: List[Any]
+    status: List[str]
+    grand_total: List[float | None]
+    days_pending: List[int | None]
+
+
+def pos_to_columns(pos: List[Dict], now: datetime) -> POColumns:
+    """
+    Read each PO dict once and split the fields used for scoring into columns.
+    
+    Supplier and status strings are interned so the repeated equality and
+    hash lookups on them can short-circuit on identity.
+    """
+    supplier, status, grand_total, days_pending = [], [], [], []
+    _intern = sys.intern
+    
+    for p in pos:
+        s = p.get("supplier")
+        supplier.append(_intern(s) if type(s) is str else s)
+        st = p.get("status", "")
+        status.append(_intern(st) if type(st) is str else st)
+        amount = p.get("grand_total")
+        grand_total.append(float(amount) if amount else None)
+        days_pending.append(_days_pending(p.get("transaction_date"), now))
+    
+    return POColumns(supplier, status, grand_total, days_pending)
+
+
+def _index_orders(columns: POColumns) -> RiskContext:
+    """
+    Build the aggregates used to score each order in one pass over the PO columns.
+    
+    Returns a RiskContext holding:
+    - open_by_supplier: orders not Completed/Cancelled, per supplier
+    - average: mean grand_total (0.0 when fewer than two orders have one)
+    """
+    open_by_supplier: Dict[str, int] = {}
+    total = 0.0
+    count = 0
+    
+    for supplier, status, amount in zip(columns.supplier, columns.status, columns.grand_total):
+        if status not in ("Completed", "Cancelled"):
+            open_by_supplier[supplier] = open_by_supplier.get(supplier, 0) + 1
+        if amount is not None:
+            total += amount
+            count += 1
+    
+    average = total / count if count >= 2 else 0.0
+    return RiskContext(average, open_by_supplier)
+
+
+def _days_pending(transaction_date: Any, now: datetime) -> int | None:
+    """Days since transaction_date ("YYYY-MM-DD[ ...]"), or None if missing/unparseable."""
+    if not transaction_date:
+        return None
+    try:
+        return (now - datetime.fromisoformat(transaction_date.split()[0])).days
+    except (ValueError, AttributeError, IndexError):
+        return None
+
+
+def evaluate_po_risk(po: Dict, ctx: RiskContext, client=None,
+                     days_pending: int | None = None) -> Dict[str, Any]:
     """
     Evaluate risk for a single purchase order.
     
+    ctx carries the aggregates precomputed once per analysis by
+    analyze_po_risks(); days_pending is the PO age in days at analysis time.
+    
     Risk scoring:
     - Status: 0-40 points
     - Price: 0-30 points
@@ -94,22 +209,21 @@ def evaluate_po_risk(po: Dict, all_pos: List[Dict], client=None) -> Dict[str, An
     supplier = po.get("supplier", "Unknown")
     status = po.get("status", "Unknown")
     amount = float(po.get("grand_total", 0))
-    transaction_date = po.get("transaction_date", "")
     
     # 1. STATUS RISK (0-40 points)
-    status_score, status_reason = evaluate_status_risk(po, transaction_date)
+    status_score, status_reason = evaluate_status_risk(po, days_pending)
     risk_score += status_score
     if status_reason:
         reasons.append(status_reason)
     
     # 2. PRICE RISK (0-30 points)
-    price_score, price_reason = evaluate_price_risk(po, all_pos)
+    price_score, price_reason = evaluate_price_risk(po, ctx.average)
     risk_score += price_score
     if price_reason:
         reasons.append(price_reason)
     
     # 3. SUPPLIER RISK (0-20 points)
-    supplier_score, supplier_reason = evaluate_supplier_risk(supplier, all_pos)
+    supplier_score, supplier_reason = evaluate_supplier_risk(supplier, ctx.open_by_supplier)
     risk_score += supplier_score
     if supplier_reason:
         reasons.append(supplier_reason)
@@ -122,31 +236,35 @@ def evaluate_po_risk(po: Dict, all_pos: List[Dict], client=None) -> Dict[str, An
     
     # Determine risk level
     if risk_score >= 60:
-        risk_level = "🔴 High Risk"
+        level = HIGH
     elif risk_score >= 30:
-        risk_level = "🟡 Medium Risk"
+        level = MEDIUM
     else:
-        risk_level = "🟢 Low Risk"
+        level = LOW
     
     # Generate recommendation
-    recommendation = generate_po_recommendation(risk_level, reasons)
+    recommendation = generate_po_recommendation(level, reasons)
     
     return {
         "order_id": po_id,
         "supplier": supplier,
         "status": status,
         "amount": amount,
-        "risk_level": risk_level,
+        "risk_level": RISK_LABELS[level],
+        "risk_level_id": level,
         "risk_score": risk_score,
         "reasons": reasons,
         "recommendation": recommendation
     }
 
 
-def evaluate_status_risk(po: Dict, transaction_date: str) -> tuple[int, str]:
+def evaluate_status_risk(po: Dict, days_pending: int | None) -> tuple[int, str]:
     """
     Evaluate risk based on order status and age.
     
+    days_pending is the PO age in days, parsed once by analyze_po_risks()
+    (None when the transaction date is missing or invalid).
+    
     Completed → 0 points (Low risk)
     To Receive/To Bill → 20 points (Medium risk)
     Long pending (>30 days) → 40 points (High risk)
@@ -154,37 +272,32 @@ def evaluate_status_risk(po: Dict, transaction_date: str) -> tuple[int, str]:
     
     status = po.get("status", "")
     
-    if status == "Completed":
-        return 0, ""
+    fixed = _STATUS_RISK.get(status)
+    if fixed is not None:
+        return fixed
     
-    if "To Receive" in status or "To Bill" in status:
+    if _status_completeness(status)[0]:
         # Check how long it's been pending
-        if transaction_date:
-            try:
-                po_date = datetime.fromisoformat(transaction_date.split()[0])
-                days_pending = (datetime.now() - po_date).days
-                
-                if days_pending > 30:
-                    return 40, f"Order pending for {days_pending} days (>30 days = High Risk)"
-                elif days_pending > 14:
-                    return 25, f"Order pending for {days_pending} days (>2 weeks)"
-                else:
-                    return 15, f"Order pending - awaiting receipt/invoice"
-            except:
-                return 20, "Status shows pending items"
-        else:
+        if days_pending is None:
             return 20, "Status shows pending items"
-    
-    if status == "Cancelled":
-        return 5, "Order cancelled (low risk)"
+        
+        if days_pending > 30:
+            return 40, f"Order pending for {days_pending} days (>30 days = High Risk)"
+        elif days_pending > 14:
+            return 25, f"Order pending for {days_pending} days (>2 weeks)"
+        else:
+            return 15, f"Order pending - awaiting receipt/invoice"
     
     return 10, f"Status: {status}"
 
 
-def evaluate_price_risk(po: Dict, all_pos: List[Dict]) -> tuple[int, str]:
+def evaluate_price_risk(po: Dict, average: float) -> tuple[int, str]:
     """
     Evaluate risk based on price compared to average.
     
+    average is the mean PO amount across the analysis (0.0 when fewer than
+    two orders have an amount, which disables the comparison).
+    
     20%+ above average → 30 points (High risk)
     10-20% above average → 15 points (Medium risk)
     Within range → 0 points (Low risk)
@@ -195,13 +308,6 @@ def evaluate_price_risk(po: Dict, all_pos: List[Dict]) -> tuple[int, str]:
     if amount == 0:
         return 5, "Order amount is zero"
     
-    # Calculate average PO amount
-    amounts = [float(p.get("grand_total", 0)) for p in all_pos if p.get("grand_total")]
-    if not amounts or len(amounts) < 2:
-        return 0, ""
-    
-    average = sum(amounts) / len(amounts)
-    
     if average == 0:
         return 0, ""
     
@@ -217,41 +323,27 @@ def evaluate_price_risk(po: Dict, all_pos: List[Dict]) -> tuple[int, str]:
     return 0, ""
 
 
-def evaluate_supplier_risk(supplier: str, all_pos: List[Dict]) -> tuple[int, str]:
+def evaluate_supplier_risk(supplier: str, open_by_supplier: Dict[str, int]) -> tuple[int, str]:
     """
     Evaluate risk based on supplier performance.
     
     3+ open orders from same supplier → 20 points
     1-2 open orders → 10 points
-    Delayed orders history → 15 points
-    Single order, on time → 0 points
+    No open orders → 0 points
     """
     
     # Count open orders from this supplier
-    open_orders = [
-        p for p in all_pos
-        if p.get("supplier") == supplier and p.get("status") not in ["Completed", "Cancelled"]
-    ]
+    open_orders = open_by_supplier.get(supplier, 0)
     
     score = 0
     reason = ""
     
-    if len(open_orders) >= 3:
+    if open_orders >= 3:
         score = 20
-        reason = f"Supplier has {len(open_orders)} open orders (concentration risk)"
-    elif len(open_orders) >= 1:
+        reason = f"Supplier has {open_orders} open orders (concentration risk)"
+    elif open_orders >= 1:
         score = 10
-        reason = f"Supplier has {len(open_orders)} open order(s)"
-    
-    # Check for delayed orders from this supplier
-    delayed_orders = [
-        p for p in all_pos
-        if p.get("supplier") == supplier and "To Receive" in p.get("status", "") or "To Bill" in p.get("status", "")
-    ]
-    
-    if len(delayed_orders) > len(open_orders):
-        score = max(score, 15)
-        reason = f"Supplier has pattern of pending orders"
+        reason = f"Supplier has {open_orders} open order(s)"
     
     return score, reason
 
@@ -264,40 +356,61 @@ def evaluate_completeness_risk(po: Dict) -> tuple[int, str]:
     Complete data → 0 points
     """
     
-    status = po.get("status", "")
+    return _status_completeness(po.get("status", ""))
+
+
+def _status_completeness(status: str) -> tuple[int, str]:
+    """Completeness score/reason for a status; table lookup for standard statuses."""
+    known = _STATUS_COMPLETENESS.get(status)
+    if known is not None:
+        return known
     
-    # If To Receive, missing receipt
+    # Non-standard status strings fall back to substring matching
     if "To Receive" in status:
         return 8, "Awaiting goods receipt"
-    
-    # If To Bill, missing invoice
     if "To Bill" in status:
         return 8, "Awaiting supplier invoice"
-    
     return 0, ""
 
 
-def generate_po_recommendation(risk_level: str, reasons: List[str]) -> str:
-    """Generate action recommendation based on risk level."""
+# Reason keyword flags used by generate_po_recommendation
+_DELAY, _PRICE, _PENDING, _OPEN = 1, 2, 4, 8
+
+
+def generate_po_recommendation(level: int, reasons: List[str]) -> str:
+    """Generate action recommendation based on risk level (HIGH/MEDIUM/LOW)."""
     
-    if "🔴" in risk_level:
-        if any("delay" in r.lower() for r in reasons):
+    if level == LOW:
+        return "No action needed - order tracking normally"
+    
+    # Classify all reasons in one pass
+    flags = 0
+    for r in reasons:
+        rl = r.lower()
+        if "delay" in rl:
+            flags |= _DELAY
+        if "amount" in rl or "above" in rl:
+            flags |= _PRICE
+        if "pending" in rl:
+            flags |= _PENDING
+        if "open" in rl:
+            flags |= _OPEN
+    
+    if level == HIGH:
+        if flags & _DELAY:
             return "Urgent: Contact supplier immediately about delivery delays"
-        elif any("amount" in r.lower() or "above" in r.lower() for r in reasons):
+        elif flags & _PRICE:
             return "Action: Negotiate pricing or find alternative supplier"
         else:
             return "Action: Review order and take corrective action"
     
-    elif "🟡" in risk_level:
-        if any("pending" in r.lower() for r in reasons):
-            return "Follow up: Check on order status with supplier"
-        elif any("open" in r.lower() for r in reasons):
-            return "Monitor: Track supplier performance on multiple orders"
-        else:
-            return "Review: Monitor this order closely"
-    
-    else:  # 🟢 Low Risk
-        return "No action needed - order tracking normally"
+    # MEDIUM
+    if flags & _PENDING:
+        return "Follow up: Check on order status with supplier"
+    elif flags & _OPEN:
+        return "Monitor: Track supplier performance on multiple orders"
+    else:
+        return "Review: Monitor this order closely"
 
 
 def generate_recommendations(risk_assessments: List[Dict]) -> List[str]:
@@ -305,8 +418,8 @@ def generate_recommendations(risk_assessments: List[Dict]) -> List[str]:
     
     recommendations = []
     
-    high_risk = [o for o in risk_assessments if "🔴" in o["risk_level"]]
-    medium_risk = [o for o in risk_assessments if "🟡" in o["risk_level"]]
+    high_risk = [o for o in risk_assessments if o["risk_level_id"] == HIGH]
+    medium_risk = [o for o in risk_assessments if o["risk_level_id"] == MEDIUM]
     
     if high_risk:
         count = len(high_risk)
@@ -1,5 +1,23 @@
 from typing import List, Dict, Any
+import heapq
 from collections import defaultdict
+from functools import lru_cache
+
+# NumPy is optional; without it (or for small inputs) the pure-Python scan is used
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Numba is optional too; when present the numeric kernels are compiled to native
+# code and used for inputs of at least _NUMPY_MIN_ROWS rows
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Below this many purchase rows NumPy array setup (and a Numba call) costs more than it saves
+_NUMPY_MIN_ROWS = 500
 
 
 def detect_price_anomalies(purchase_orders: List[Dict]) -> Dict[str, Any]:
@@ -11,131 +29,263 @@ def detect_price_anomalies(purchase_orders: List[Dict]) -> Dict[str, Any]:
             "recommendations": ["No purchase orders to analyze."],
         }
 
-    item_purchases = _group_by_item(purchase_orders)
-    item_metrics = _calculate_item_metrics(item_purchases)
-    anomalies = _detect_anomalies(item_metrics, threshold=0.20)
-    recommendations = _generate_anomaly_recommendations(anomalies, item_metrics)
+    item_metrics = _aggregate_items(purchase_orders)
+    anomalies, by_severity = _detect_anomalies(item_metrics, threshold=0.20)
+    recommendations = _generate_anomaly_recommendations(anomalies, by_severity, item_metrics)
 
     return {
         "anomalies": anomalies,
         "summary": {
             "total_items_analyzed": len(item_metrics),
-            "items_with_anomalies": len(set(a["item_name"] for a in anomalies)),
+            "items_with_anomalies": len(set().union(*(g["items"] for g in by_severity.values()))),
             "anomaly_count": len(anomalies),
         },
         "recommendations": recommendations,
     }
 
 
-def _group_by_item(purchase_orders: List[Dict]) -> Dict[str, List[Dict]]:
-    """Group purchases by item name."""
-    items = defaultdict(list)
+def count_anomalies(purchase_orders: List[Dict], threshold: float = 0.20) -> tuple[int, int, int]:
+    """
+    Count price anomalies without building anomaly records.
 
+    Returns (items_analyzed, anomaly_count, critical_count), matching the
+    summary of detect_price_anomalies() for callers that only need numbers.
+    """
+    item_index = {}
+    item_ids = []
+    rates = []
     for po in purchase_orders:
-        item_name = po.get("item_code") or po.get("item_name") or "Unknown"
-        supplier = po.get("supplier") or po.get("supplier_name") or "Unknown"
-        quantity = _safe_float(po.get("qty")) or _safe_float(po.get("quantity"))
-        rate = _safe_float(po.get("rate")) or _safe_float(po.get("unit_price"))
-        amount = _safe_float(po.get("amount")) or _safe_float(po.get("line_total"))
-
-        if rate is None and quantity and amount:
-            rate = amount / quantity
-        elif rate is None:
-            rate = amount
-
-        if item_name and supplier and rate is not None:
-            items[item_name].append({
-                "supplier": supplier,
-                "rate": rate,
-                "quantity": quantity or 1,
-                "amount": amount or (rate * (quantity or 1)),
-                "status": po.get("status", "Unknown"),
-            })
-
-    return items
-
-
-def _calculate_item_metrics(item_purchases: Dict[str, List[Dict]]) -> Dict[str, Dict[str, Any]]:
-    """Calculate average price per item."""
-    metrics = {}
-
-    for item_name, purchases in item_purchases.items():
-        if not purchases:
+        parsed = _parse_purchase(po)
+        if parsed is None:
             continue
+        item_ids.append(item_index.setdefault(parsed[0], len(item_index)))
+        rates.append(parsed[2])
 
-        rates = [p["rate"] for p in purchases]
-        avg_rate = sum(rates) / len(rates)
+    n_items = len(item_index)
+    if not n_items:
+        return 0, 0, 0
 
-        metrics[item_name] = {
-            "average_rate": avg_rate,
-            "min_rate": min(rates),
-            "max_rate": max(rates),
-            "supplier_count": len(set(p["supplier"] for p in purchases)),
-            "purchases": purchases,
-        }
+    if _count_kernel_jit is not None and len(rates) >= _NUMPY_MIN_ROWS:
+        n_anomalies, n_critical = _count_kernel_jit(
+            np.asarray(item_ids, dtype=np.intp), np.asarray(rates, dtype=np.float64),
+            np.zeros(n_items, dtype=np.float64), np.zeros(n_items, dtype=np.int64), threshold,
+        )
+    else:
+        n_anomalies, n_critical = _count_kernel(item_ids, rates, [0.0] * n_items, [0] * n_items, threshold)
+    return n_items, int(n_anomalies), int(n_critical)
+
+
+def _count_kernel(item_ids, rates, sums, counts, threshold):
+    """Numeric kernel for count_anomalies; runs on lists, or on arrays under Numba."""
+    for k in range(len(rates)):
+        sums[item_ids[k]] += rates[k]
+        counts[item_ids[k]] += 1
+
+    n_anomalies = 0
+    n_critical = 0
+    for k in range(len(rates)):
+        i = item_ids[k]
+        avg_rate = sums[i] / counts[i]
+        if rates[k] > avg_rate * (1 + threshold):
+            n_anomalies += 1
+            if avg_rate != 0 and (rates[k] - avg_rate) / avg_rate * 100 >= 50:
+                n_critical += 1
+    return n_anomalies, n_critical
+
+
+_count_kernel_jit = njit(cache=True)(_count_kernel) if njit is not None and np is not None else None
+
+
+def _parse_purchase(po: Dict) -> tuple[str, str, float, float | None, float | None] | None:
+    """Extract (item_name, supplier, rate, quantity, amount) from a PO line, or None without a rate."""
+    item_name = po.get("item_code") or po.get("item_name") or "Unknown"
+    supplier = po.get("supplier") or po.get("supplier_name") or "Unknown"
+    quantity = _safe_float(po.get("qty")) or _safe_float(po.get("quantity"))
+    rate = _safe_float(po.get("rate")) or _safe_float(po.get("unit_price"))
+    amount = _safe_float(po.get("amount")) or _safe_float(po.get("line_total"))
+
+    if rate is None and quantity and amount:
+        rate = amount / quantity
+    elif rate is None:
+        rate = amount
+
+    if not (item_name and supplier and rate is not None):
+        return None
+    return item_name, supplier, rate, quantity, amount
+
+
+def _aggregate_items(purchase_orders: List[Dict]) -> Dict[str, Dict[str, Any]]:
+    """Group purchases by item and accumulate price metrics in a single pass."""
+    metrics = {}
+
+    for po in purchase_orders:
+        parsed = _parse_purchase(po)
+        if parsed is None:
+            continue
+        item_name, supplier, rate, quantity, amount = parsed
+
+        agg = metrics.get(item_name)
+        if agg is None:
+            agg = metrics[item_name] = {
+                "sum": 0.0, "count": 0, "min_rate": rate, "max_rate": rate,
+                "min_supplier": supplier, "suppliers": set(), "purchases": [],
+            }
+        agg["sum"] += rate
+        agg["count"] += 1
+        if rate < agg["min_rate"]:
+            agg["min_rate"] = rate
+            agg["min_supplier"] = supplier
+        elif rate > agg["max_rate"]:
+            agg["max_rate"] = rate
+        agg["suppliers"].add(supplier)
+        agg["purchases"].append({
+            "supplier": supplier,
+            "rate": rate,
+            "quantity": quantity or 1,
+            "amount": amount or (rate * (quantity or 1)),
+            "status": po.get("status", "Unknown"),
+        })
+
+    for agg in metrics.values():
+        agg["average_rate"] = agg["sum"] / agg["count"]
+        agg["supplier_count"] = len(agg["suppliers"])
 
     return metrics
 
 
-def _detect_anomalies(item_metrics: Dict[str, Dict], threshold: float = 0.20) -> List[Dict]:
-    """Detect prices 20% higher than average."""
-    anomalies = []
+def _detect_anomalies(item_metrics: Dict[str, Dict], threshold: float = 0.20) -> tuple[List[Dict], Dict[str, Dict]]:
+    """
+    Detect prices 20% higher than average.
 
-    for item_name, metrics in item_metrics.items():
-        avg_rate = metrics["average_rate"]
-        threshold_price = avg_rate * (1 + threshold)
-
-        for purchase in metrics["purchases"]:
-            rate = purchase["rate"]
-
-            if rate > threshold_price:
-                difference = rate - avg_rate
-                percentage = (difference / avg_rate) * 100 if avg_rate else 0
-
-                anomalies.append({
-                    "item_name": item_name,
-                    "supplier": purchase["supplier"],
-                    "price": _format_currency(rate),
-                    "price_raw": rate,
-                    "average_price": _format_currency(avg_rate),
-                    "average_price_raw": avg_rate,
-                    "difference": _format_currency(difference),
-                    "difference_raw": difference,
-                    "percentage": f"{percentage:.1f}%",
-                    "percentage_raw": percentage,
-                    "severity": _classify_severity(percentage),
-                })
+    Returns the anomalies sorted by percentage (highest first) and a
+    per-severity summary: {severity: {"count", "suppliers", "items", "top"}},
+    where "top" is the highest-percentage anomaly of that severity.
+    """
+    total_rows = sum(m["count"] for m in item_metrics.values())
+    if np is not None and total_rows >= _NUMPY_MIN_ROWS:
+        anomalies = _detect_anomalies_vectorized(item_metrics, threshold, total_rows)
+    else:
+        anomalies = []
+        for item_name, metrics in item_metrics.items():
+            avg_rate = metrics["average_rate"]
+            threshold_price = avg_rate * (1 + threshold)
+
+            for purchase in metrics["purchases"]:
+                if purchase["rate"] > threshold_price:
+                    anomalies.append(_build_anomaly(item_name, purchase, avg_rate))
 
     anomalies.sort(key=lambda x: x["percentage_raw"], reverse=True)
+
+    by_severity = {}
+    for anomaly in anomalies:
+        group = by_severity.get(anomaly["severity"])
+        if group is None:
+            group = by_severity[anomaly["severity"]] = {
+                "count": 0, "suppliers": set(), "items": set(), "top": anomaly,
+            }
+        group["count"] += 1
+        group["suppliers"].add(anomaly["supplier"])
+        group["items"].add(anomaly["item_name"])
+
+    return anomalies, by_severity
+
+
+def _detect_anomalies_vectorized(item_metrics: Dict[str, Dict], threshold: float,
+                                 total_rows: int) -> List[Dict]:
+    """Compare all rates against their item average in one NumPy op; build dicts for hits only."""
+    rates = np.empty(total_rows, dtype=np.float64)
+    item_idx = np.empty(total_rows, dtype=np.intp)
+    thresholds = np.empty(len(item_metrics), dtype=np.float64)
+    items = list(item_metrics.items())
+
+    pos = 0
+    for i, (_, metrics) in enumerate(items):
+        purchases = metrics["purchases"]
+        n = len(purchases)
+        rates[pos:pos + n] = [p["rate"] for p in purchases]
+        item_idx[pos:pos + n] = i
+        thresholds[i] = metrics["average_rate"] * (1 + threshold)
+        pos += n
+
+    if _scan_anomalies_jit is not None:
+        mask = _scan_anomalies_jit(rates, item_idx, thresholds)
+    else:
+        mask = rates > thresholds[item_idx]
+    hits = np.nonzero(mask)[0]
+    if not len(hits):
+        return []
+
+    # Map flat row positions back to (item, purchase) without materializing every pair
+    offsets = np.cumsum([0] + [m["count"] for _, m in items])
+    anomalies = []
+    for row in hits.tolist():
+        i = int(item_idx[row])
+        item_name, metrics = items[i]
+        purchase = metrics["purchases"][row - int(offsets[i])]
+        anomalies.append(_build_anomaly(item_name, purchase, metrics["average_rate"]))
     return anomalies
 
 
-def _generate_anomaly_recommendations(anomalies: List[Dict], item_metrics: Dict[str, Dict]) -> List[str]:
+def _scan_anomalies(rates, item_ids, thresholds):
+    """Numeric kernel: flag rows whose rate exceeds their item's threshold price."""
+    mask = np.zeros(rates.shape[0], dtype=np.bool_)
+    for k in range(rates.shape[0]):
+        if rates[k] > thresholds[item_ids[k]]:
+            mask[k] = True
+    return mask
+
+
+# fastmath is left off so comparisons stay bit-identical to the Python path
+_scan_anomalies_jit = njit(cache=True)(_scan_anomalies) if njit is not None and np is not None else None
+
+
+def _build_anomaly(item_name: str, purchase: Dict, avg_rate: float) -> Dict[str, Any]:
+    """Build the anomaly record for a purchase priced above its item average."""
+    rate = purchase["rate"]
+    difference = rate - avg_rate
+    percentage = (difference / avg_rate) * 100 if avg_rate else 0
+
+    return {
+        "item_name": item_name,
+        "supplier": purchase["supplier"],
+        "price": _format_currency(rate),
+        "price_raw": rate,
+        "average_price": _format_currency(avg_rate),
+        "average_price_raw": avg_rate,
+        "difference": _format_currency(difference),
+        "difference_raw": difference,
+        "percentage": f"{percentage:.1f}%",
+        "percentage_raw": percentage,
+        "severity": _classify_severity(percentage),
+    }
+
+
+def _generate_anomaly_recommendations(anomalies: List[Dict], by_severity: Dict[str, Dict],
+                                      item_metrics: Dict[str, Dict]) -> List[str]:
     """Generate recommendations based on anomalies."""
     if not anomalies:
         return ["No significant price anomalies were detected."]
 
     recommendations = []
-    critical = [a for a in anomalies if a["severity"] == "Critical"]
-    high = [a for a in anomalies if a["severity"] == "High"]
+    critical = by_severity.get("Critical")
+    high = by_severity.get("High")
 
     if critical:
-        suppliers = set(a["supplier"] for a in critical)
-        items = set(a["item_name"] for a in critical)
         recommendations.append(
-            f"CRITICAL: {len(critical)} severe price anomalies. Negotiate with {', '.join(list(suppliers)[:2])} for {len(items)} items."
+            f"CRITICAL: {critical['count']} severe price anomalies. Negotiate with {', '.join(list(critical['suppliers'])[:2])} for {len(critical['items'])} items."
         )
 
     if high:
         recommendations.append(
-            f"Review pricing from {len(set(a['supplier'] for a in high))} suppliers with prices {high[0]['percentage']} above average."
+            f"Review pricing from {len(high['suppliers'])} suppliers with prices {high['top']['percentage']} above average."
         )
 
     supplier_anomaly_count = defaultdict(int)
     for anomaly in anomalies:
         supplier_anomaly_count[anomaly["supplier"]] += 1
 
-    top_offenders = sorted(supplier_anomaly_count.items(), key=lambda x: x[1], reverse=True)
+    # Only the worst supplier is reported, so skip sorting the whole tally
+    top_offenders = heapq.nlargest(1, supplier_anomaly_count.items(), key=lambda x: x[1])
     if top_offenders and top_offenders[0][1] > 1:
         recommendations.append(
             f"Supplier '{top_offenders[0][0]}' has {top_offenders[0][1]} price anomalies. Request quotes from competitors."
@@ -143,8 +293,7 @@ def _generate_anomaly_recommendations(anomalies: List[Dict], item_metrics: Dict[
 
     cheapest_suppliers = defaultdict(list)
     for item_name, metrics in item_metrics.items():
-        min_supplier = min(metrics["purchases"], key=lambda x: x["rate"])
-        cheapest_suppliers[min_supplier["supplier"]].append(item_name)
+        cheapest_suppliers[metrics["min_supplier"]].append(item_name)
 
     if cheapest_suppliers:
         best_supplier = max(cheapest_suppliers.items(), key=lambda x: len(x[1]))
@@ -180,8 +329,9 @@ def _safe_float(value: Any) -> float | None:
     return None
 
 
+@lru_cache(maxsize=4096)
 def _format_currency(amount: float | None) -> str:
-    """Format as currency."""
+    """Format as currency (cached: item averages repeat across many anomalies)."""
     if amount is None:
         return "$0.00"
     return f"${amount:,.2f}"
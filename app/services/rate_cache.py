@@ -0,0 +1,101 @@
+"""
+Historical Item Rate Cache
+
+Persists (supplier, item_code) -> (average_rate, count) in SQLite so PO
+approvals can reuse historical averages instead of re-fetching purchase
+history from ERPNext on every analysis.
+
+Entries expire after RATE_CACHE_TTL seconds. The database is in-memory
+(per process) unless RATE_CACHE_PATH points at a file.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.config import RATE_CACHE_PATH, RATE_CACHE_TTL
+
+# Supplier key for averages computed across all suppliers
+ALL_SUPPLIERS = ""
+
+Key = Tuple[str, str]
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_path = RATE_CACHE_PATH
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the cache database on first use (caller holds _lock)."""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(_path, check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS rates ("
+            " supplier TEXT NOT NULL,"
+            " item_code TEXT NOT NULL,"
+            " avg REAL NOT NULL,"
+            " n INTEGER NOT NULL,"
+            " ts INTEGER NOT NULL,"
+            " PRIMARY KEY (supplier, item_code))"
+        )
+    return _conn
+
+
+def get_many(keys: Iterable[Key], ttl: int = RATE_CACHE_TTL) -> Dict[Key, Tuple[float, int]]:
+    """Return fresh cached (avg_rate, count) for the given keys; misses are omitted."""
+    keys = set(keys)
+    if not keys:
+        return {}
+
+    cutoff = int(time.time()) - ttl
+    found = {}
+    with _lock:
+        conn = _connect()
+        for supplier, item_code in keys:
+            row = conn.execute(
+                "SELECT avg, n FROM rates WHERE supplier = ? AND item_code = ? AND ts >= ?",
+                (supplier, item_code, cutoff),
+            ).fetchone()
+            if row is not None:
+                found[(supplier, item_code)] = (row[0], row[1])
+    return found
+
+
+def put_many(entries: Dict[Key, Tuple[float, int]]) -> None:
+    """Insert or replace cached averages."""
+    if not entries:
+        return
+
+    now = int(time.time())
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO rates (supplier, item_code, avg, n, ts) VALUES (?, ?, ?, ?, ?)",
+                [(s, i, avg, n, now) for (s, i), (avg, n) in entries.items()],
+            )
+
+
+def bump(supplier: str, item_code: str) -> None:
+    """
+    Invalidate cached averages for an item after a new PO is submitted.
+
+    Drops both the supplier-specific and the all-supplier entry.
+    """
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM rates WHERE item_code = ? AND supplier IN (?, ?)",
+                (item_code, supplier or ALL_SUPPLIERS, ALL_SUPPLIERS),
+            )
+
+
+def clear() -> None:
+    """Remove every cached rate."""
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM rates")
@@ -79,6 +79,22 @@ def explain_recommendations(intent: str, user_question: str, data: Dict[str, Any
         po_list = data if isinstance(data, list) else []
         po_count = len(po_list)
         
+        # One pass: status histogram, supplier set and completed count
+        statuses = {}
+        suppliers = set()
+        has_status = False
+        completed_count = 0
+        for po in po_list:
+            status = po.get('status', 'Unknown')
+            statuses[status] = statuses.get(status, 0) + 1
+            if po.get('status'):
+                has_status = True
+                if status == 'Completed':
+                    completed_count += 1
+            supplier = po.get('supplier')
+            if supplier:
+                suppliers.add(supplier)
+        
         explanation["summary"] = f"You have {po_count} purchase orders in the system with varying statuses and suppliers."
         
         # Reason 1: Total orders
@@ -88,12 +104,7 @@ def explain_recommendations(intent: str, user_question: str, data: Dict[str, Any
         })
         
         # Reason 2: Status breakdown (if available)
-        if po_count > 0 and any(po.get('status') for po in po_list):
-            statuses = {}
-            for po in po_list:
-                status = po.get('status', 'Unknown')
-                statuses[status] = statuses.get(status, 0) + 1
-            
+        if has_status:
             status_text = ", ".join([f"{count} {status}" for status, count in sorted(statuses.items())])
             explanation["reasons"].append({
                 "recommendation": "Order status distribution",
@@ -101,8 +112,7 @@ def explain_recommendations(intent: str, user_question: str, data: Dict[str, Any
             })
         
         # Reason 3: Supplier diversity (if available)
-        if po_count > 0 and any(po.get('supplier') for po in po_list):
-            suppliers = set(po.get('supplier') for po in po_list if po.get('supplier'))
+        if suppliers:
             explanation["reasons"].append({
                 "recommendation": "Supplier diversity",
                 "evidence": f"Orders placed with {len(suppliers)} different suppliers"
@@ -111,7 +121,7 @@ def explain_recommendations(intent: str, user_question: str, data: Dict[str, Any
         explanation["next_actions"] = [
             "Review orders by status (To Receive, To Bill, Completed) to track progress",
             "Analyze supplier concentration - ensure you're not over-dependent on single suppliers",
-            f"Follow up on pending items in {po_count - sum(1 for po in po_list if po.get('status') == 'Completed')} orders"
+            f"Follow up on pending items in {po_count - completed_count} orders"
         ]
     
     # PRICE ANOMALIES
@@ -200,8 +210,9 @@ def explain_recommendations(intent: str, user_question: str, data: Dict[str, Any
         
         if isinstance(data, list) and count > 0:
             # Get unique values if applicable
-            if 'supplier' in str(data[0]) or 'customer' in str(data[0]):
-                unique_field = 'supplier' if 'supplier' in str(data[0]) else 'customer'
+            first = data[0] if isinstance(data[0], dict) else {}
+            unique_field = 'supplier' if 'supplier' in first else ('customer' if 'customer' in first else None)
+            if unique_field:
                 unique_count = len(set(item.get(unique_field) for item in data if item.get(unique_field)))
                 explanation["reasons"].append({
                     "recommendation": f"Unique {unique_field}s",
@@ -220,20 +231,21 @@ def explain_recommendations(intent: str, user_question: str, data: Dict[str, Any
 def format_explanation_text(explanation: Dict[str, Any]) -> str:
     """Format explanation as readable text."""
     
-    text = f"\n{explanation['title']}\n"
-    text += "=" * 50 + "\n\n"
-    
-    text += f"Summary:\n{explanation['summary']}\n\n"
+    parts = [
+        f"\n{explanation['title']}\n",
+        "=" * 50 + "\n\n",
+        f"Summary:\n{explanation['summary']}\n\n",
+    ]
     
     if explanation['reasons']:
-        text += "Reasons:\n"
+        parts.append("Reasons:\n")
         for i, reason in enumerate(explanation['reasons'], 1):
-            text += f"{i}. {reason['recommendation']}\n"
-            text += f"   Evidence: {reason['evidence']}\n\n"
+            parts.append(f"{i}. {reason['recommendation']}\n")
+            parts.append(f"   Evidence: {reason['evidence']}\n\n")
     
     if explanation['next_actions']:
-        text += "Next Actions:\n"
+        parts.append("Next Actions:\n")
         for action in explanation['next_actions']:
-            text += f"• {action}\n"
+            parts.append(f"• {action}\n")
     
-    return text
+    return "".join(parts)
@@ -0,0 +1,23 @@
+"""
+Shared FastAPI TestClient for every test module in the process.
+
+The client is entered once (running the app's startup events) and exited
+at interpreter shutdown. app.main is imported on first use, so modules that
+only pull in test helpers (e.g. the service-logic tests) never load the app.
+"""
+
+import atexit
+import functools
+
+from fastapi.testclient import TestClient
+
+
+@functools.lru_cache(maxsize=1)
+def get_test_client() -> TestClient:
+    """Return the process-wide TestClient, entering it on first use."""
+    from app.main import app
+
+    client = TestClient(app)
+    client.__enter__()
+    atexit.register(client.__exit__, None, None, None)
+    return client
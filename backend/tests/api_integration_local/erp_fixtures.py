@@ -0,0 +1,54 @@
+"""
+Recorded ERPNext responses for running the integration tests without a live ERP.
+
+record_mocks.py stores each ERPNextClient call's result as JSON under
+backend/tests/fixtures/erpnext, keyed by method name and a hash of its
+arguments. With USE_MOCK_ERP=true the integration tests replay them.
+"""
+
+import hashlib
+import json
+import os
+
+import requests
+
+FIXTURES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "fixtures", "erpnext"))
+
+
+def fixture_path(method, args, kwargs):
+    """File holding the recorded result of client.method(*args, **kwargs)."""
+    payload = json.dumps([list(args), kwargs], sort_keys=True, default=str)
+    digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=6).hexdigest()
+    return os.path.join(FIXTURES_DIR, f"{method}_{digest}.json")
+
+
+class ReplayERPClient:
+    """Stands in for ERPNextClient, answering every call from recorded fixtures."""
+
+    def __getattr__(self, method):
+        def replay(*args, **kwargs):
+            path = fixture_path(method, args, kwargs)
+            if not os.path.exists(path):
+                # Surface like an ERP failure so callers take their error paths
+                raise requests.RequestException(f"No recorded ERPNext response: {os.path.basename(path)}")
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        return replay
+
+
+class RecordingERPClient:
+    """Wraps a real ERPNextClient and writes each call's result to a fixture file."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, method):
+        target = getattr(self._client, method)
+
+        def record(*args, **kwargs):
+            result = target(*args, **kwargs)
+            os.makedirs(FIXTURES_DIR, exist_ok=True)
+            with open(fixture_path(method, args, kwargs), "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2, sort_keys=True, default=str)
+            return result
+        return record
@@ -0,0 +1,36 @@
+"""
+Record ERPNext responses for USE_MOCK_ERP=true integration runs.
+
+Runs the integration suite against the live ERPNext configured in .env
+(ERP_URL / ERP_API_KEY / ERP_API_SECRET) and saves every client call's
+result under backend/tests/fixtures/erpnext.
+
+Usage (from the repo root):
+    python -m backend.tests.api_integration_local.record_mocks
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+from app.models import ERPNextClient
+from backend.tests.api_integration_local import test_endpoints
+from backend.tests.api_integration_local.erp_fixtures import FIXTURES_DIR, RecordingERPClient
+
+
+def main():
+    if os.getenv("USE_MOCK_ERP", "").lower() == "true":
+        sys.exit("Unset USE_MOCK_ERP to record from a live ERPNext.")
+
+    recorder = RecordingERPClient(ERPNextClient())
+    with patch("app.controllers.data.get_client", return_value=recorder):
+        suite = unittest.defaultTestLoader.loadTestsFromModule(test_endpoints)
+        result = unittest.TextTestRunner(verbosity=2).run(suite)
+
+    print(f"Fixtures written to {FIXTURES_DIR}")
+    sys.exit(0 if result.wasSuccessful() else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ Integration tests for real ERPNext running locally.
 SKIPS if running in CI OR if ERP_URL / ERP_API_KEY not set.
 Tests run ONLY locally, NOT in CI.
 
+With USE_MOCK_ERP=true the tests run anywhere, replaying ERPNext responses
+recorded by record_mocks.py instead of calling a live ERP.
+
 Validates:
 - Response structure and status codes
 - Real ERPNext data fields and types
@@ -10,15 +13,86 @@ Validates:
 - Graceful skipping when no data exists
 """
 
+import asyncio
 import unittest
+import operator
 import os
-import sys
-from fastapi.testclient import TestClient
-
-# Add app directory to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+from unittest.mock import Mock, patch
+import httpx
 
 from app.main import app
+from backend.tests._client import get_test_client
+from backend.tests.api_integration_local.erp_fixtures import ReplayERPClient
+
+try:
+    import orjson
+except ImportError:  # Optional: faster parsing of large list responses
+    orjson = None
+
+try:
+    import fastjsonschema
+except ImportError:  # Optional: validators fall back to hand-written checks
+    fastjsonschema = None
+
+# Read once at import: (USE_MOCK_ERP, CI, ERP_URL, ERP_API_KEY)
+_ENV = (
+    os.getenv("USE_MOCK_ERP", "").lower() == "true",
+    os.getenv("CI", "").lower() == "true",
+    os.getenv("ERP_URL"),
+    os.getenv("ERP_API_KEY"),
+)
+
+# Replay recorded responses anywhere; otherwise need a live ERP and never run in CI
+# (GitHub Actions usually sets CI=true)
+_LIVE = _ENV[0] or (not _ENV[1] and bool(_ENV[2] and _ENV[3]))
+_SKIP_REASON = "Local ERP integration only: set ERP_URL and ERP_API_KEY outside CI, or USE_MOCK_ERP=true."
+
+# A non-empty string: at least one non-whitespace character
+_NON_EMPTY_STRING = {"type": "string", "pattern": r"\S"}
+
+SUPPLIER_SCHEMA = {
+    "type": "object",
+    "required": ["name"],
+    "properties": {"name": _NON_EMPTY_STRING},
+}
+
+# PO fields that must be non-empty strings, and optional numeric fields
+_PO_REQUIRED = ("name", "supplier", "status")
+_PO_NUMERIC = frozenset({"total", "grand_total"})
+
+PO_SCHEMA = {
+    "type": "object",
+    "required": list(_PO_REQUIRED),
+    "properties": {
+        **{field: _NON_EMPTY_STRING for field in _PO_REQUIRED},
+        **{field: {"type": ["number", "null"]} for field in _PO_NUMERIC},
+    },
+}
+
+# Compiled once per process into plain Python validators
+_supplier_validator = fastjsonschema.compile(SUPPLIER_SCHEMA) if fastjsonschema else None
+_po_validator = fastjsonschema.compile(PO_SCHEMA) if fastjsonschema else None
+
+
+def _columnize(records, keys):
+    """
+    Columnar view of records: one tuple of values per key.
+
+    Raises KeyError if a record lacks one of the keys.
+    """
+    rows = map(operator.itemgetter(*keys), records)
+    if len(keys) == 1:
+        return [tuple(rows)]
+    return list(zip(*rows)) or [()] * len(keys)
+
+
+def _check_schema(validator, record, label):
+    """Run a compiled schema validator, reporting failures as test assertions."""
+    try:
+        validator(record)
+    except fastjsonschema.JsonSchemaException as e:
+        raise AssertionError(f"Invalid {label}: {e.message}") from None
+    return record
 
 
 class LocalIntegrationTestBase(unittest.TestCase):
@@ -29,22 +103,51 @@ class LocalIntegrationTestBase(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """
-        Skip all tests:
-        - Always skip in CI
-        - Skip if ERP_URL or ERP_API_KEY not set
+        Share one client across the class's tests.
+
+        Test classes are skipped up front (see _LIVE); with USE_MOCK_ERP=true
+        the ERP client is replaced by one replaying recorded responses, and
+        the background rate prefetch (a live-ERP warm-up with no recorded
+        fixture) is turned off.
         """
-        # 1) Force skip in CI (GitHub Actions usually sets CI=true)
-        if os.getenv("CI", "").lower() == "true":
-            raise unittest.SkipTest("Integration tests run locally only (skipped in CI).")
+        cls.mock_mode, _, cls.erp_url, cls.erp_api_key = _ENV
+        cls._erp_patcher = None
+
+        if cls.mock_mode:
+            cls._erp_patcher = patch.multiple(
+                "app.controllers.data",
+                get_client=Mock(return_value=ReplayERPClient()),
+                prefetch_rates=Mock(return_value=False),
+            )
+            cls._erp_patcher.start()
+
+        # Process-wide client; app startup events run once
+        cls.client = get_test_client()
 
-        # 2) Skip if env vars missing
-        cls.erp_url = os.getenv("ERP_URL")
-        cls.erp_api_key = os.getenv("ERP_API_KEY")
+        # GET responses shared by the tests of this class, keyed by path
+        cls._cache = {}
 
-        if not cls.erp_url or not cls.erp_api_key:
-            raise unittest.SkipTest("ERP_URL or ERP_API_KEY not set. Skipping integration tests.")
+    @classmethod
+    def tearDownClass(cls):
+        """Stop replaying recorded ERPNext responses."""
+        if cls._erp_patcher is not None:
+            cls._erp_patcher.stop()
+
+    def cached_get(self, path):
+        """GET path once per test class; later calls reuse the response (read-only tests)."""
+        cache = type(self)._cache
+        response = cache.get(path)
+        if response is None:
+            response = self.client.get(path)
+            cache[path] = response
+        return response
 
-        cls.client = TestClient(app)
+    @staticmethod
+    def _json(response):
+        """Parse a response body (orjson when available, same dict/list result)."""
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
 
     @staticmethod
     def validate_response_structure(response_data):
@@ -76,19 +179,18 @@ class LocalIntegrationTestBase(unittest.TestCase):
     @staticmethod
     def validate_supplier(supplier):
         """Validate supplier record has required fields."""
+        if _supplier_validator is not None:
+            return _check_schema(_supplier_validator, supplier, "supplier")
+
         if not isinstance(supplier, dict):
             raise AssertionError("Supplier must be a dictionary")
-
         if "name" not in supplier:
             raise AssertionError("Supplier missing required field: name")
-
         if supplier["name"] is None:
             raise AssertionError("Supplier field 'name' cannot be None")
-
         if not isinstance(supplier["name"], str):
             raise AssertionError("Supplier name must be string")
-
-        if len(supplier["name"].strip()) == 0:
+        if not supplier["name"].strip():
             raise AssertionError("Supplier name cannot be empty")
 
         return supplier
@@ -96,54 +198,48 @@ class LocalIntegrationTestBase(unittest.TestCase):
     @staticmethod
     def validate_purchase_order(po):
         """Validate purchase order record has required fields and valid data."""
+        if _po_validator is not None:
+            return _check_schema(_po_validator, po, "PO")
+
         if not isinstance(po, dict):
             raise AssertionError("PO must be a dictionary")
 
-        required_fields = ["name", "supplier", "status"]
-        for field in required_fields:
+        for field in _PO_REQUIRED:
             if field not in po:
                 raise AssertionError(f"PO missing required field: {field}")
             if po[field] is None:
                 raise AssertionError(f"PO field '{field}' cannot be None")
-
-        if not isinstance(po["name"], str) or len(po["name"].strip()) == 0:
-            raise AssertionError("PO name must be a non-empty string")
-
-        if not isinstance(po["supplier"], str) or len(po["supplier"].strip()) == 0:
-            raise AssertionError("PO supplier must be a non-empty string")
-
-        if not isinstance(po["status"], str) or len(po["status"].strip()) == 0:
-            raise AssertionError("PO status must be a non-empty string")
+            if not (isinstance(po[field], str) and po[field].strip()):
+                raise AssertionError(f"PO {field} must be a non-empty string")
 
         # Optional numeric fields
-        if "total" in po and po["total"] is not None and not isinstance(po["total"], (int, float)):
-            raise AssertionError("Total must be numeric")
-
-        if "grand_total" in po and po["grand_total"] is not None and not isinstance(po["grand_total"], (int, float)):
-            raise AssertionError("Grand total must be numeric")
+        for field in _PO_NUMERIC & po.keys():
+            if po[field] is not None and not isinstance(po[field], (int, float)):
+                raise AssertionError(f"PO {field} must be numeric")
 
         return po
 
 
+@unittest.skipUnless(_LIVE, _SKIP_REASON)
 class TestSuppliersIntegration(LocalIntegrationTestBase):
     """Integration tests for suppliers endpoint against real ERPNext."""
 
     def test_suppliers_endpoint_returns_200(self):
-        response = self.client.get("/suppliers")
+        response = self.cached_get("/suppliers")
         self.assertEqual(response.status_code, 200, "Suppliers endpoint should return 200")
 
     def test_suppliers_response_has_valid_structure(self):
-        response = self.client.get("/suppliers")
+        response = self.cached_get("/suppliers")
         self.assertEqual(response.status_code, 200)
 
-        data = self.validate_response_structure(response.json())
+        data = self.validate_response_structure(self._json(response))
         self.assertIsInstance(data, list, "Suppliers data must be a list")
 
     def test_suppliers_contains_valid_data(self):
-        response = self.client.get("/suppliers")
+        response = self.cached_get("/suppliers")
         self.assertEqual(response.status_code, 200)
 
-        suppliers = self.validate_response_structure(response.json())
+        suppliers = self.validate_response_structure(self._json(response))
         suppliers = self.validate_non_empty_data(suppliers, "supplier")
 
         # Validate up to first 4 suppliers (stable even if only 1-2 exist)
@@ -155,37 +251,36 @@ class TestSuppliersIntegration(LocalIntegrationTestBase):
         Replaces the old 'unique names' test (which can be flaky in real ERP data).
         This checks quality without assuming uniqueness.
         """
-        response = self.client.get("/suppliers")
+        response = self.cached_get("/suppliers")
         self.assertEqual(response.status_code, 200)
 
-        suppliers = self.validate_response_structure(response.json())
+        suppliers = self.validate_response_structure(self._json(response))
         suppliers = self.validate_non_empty_data(suppliers, "supplier")
 
-        for s in suppliers[:20]:
-            self.assertIn("name", s)
-            self.assertIsInstance(s["name"], str)
-            self.assertGreater(len(s["name"].strip()), 0)
+        bad = next((s for s in suppliers[:20] if not (isinstance(s.get("name"), str) and s["name"].strip())), None)
+        self.assertIsNone(bad, f"Supplier name must be a non-empty string: {bad}")
 
 
+@unittest.skipUnless(_LIVE, _SKIP_REASON)
 class TestPurchaseOrdersIntegration(LocalIntegrationTestBase):
     """Integration tests for purchase orders endpoint against real ERPNext."""
 
     def test_purchase_orders_endpoint_returns_200(self):
-        response = self.client.get("/purchase-orders")
+        response = self.cached_get("/purchase-orders")
         self.assertEqual(response.status_code, 200, "Purchase orders endpoint should return 200")
 
     def test_purchase_orders_response_has_valid_structure(self):
-        response = self.client.get("/purchase-orders")
+        response = self.cached_get("/purchase-orders")
         self.assertEqual(response.status_code, 200)
 
-        data = self.validate_response_structure(response.json())
+        data = self.validate_response_structure(self._json(response))
         self.assertIsInstance(data, list, "Purchase orders data must be a list")
 
     def test_purchase_orders_contains_valid_data(self):
-        response = self.client.get("/purchase-orders")
+        response = self.cached_get("/purchase-orders")
         self.assertEqual(response.status_code, 200)
 
-        pos = self.validate_response_structure(response.json())
+        pos = self.validate_response_structure(self._json(response))
         pos = self.validate_non_empty_data(pos, "purchase order")
 
         for po in pos[:4]:
@@ -196,43 +291,73 @@ class TestPurchaseOrdersIntegration(LocalIntegrationTestBase):
         response = self.client.get(f"/purchase-orders?limit={limit}")
         self.assertEqual(response.status_code, 200)
 
-        pos = self.validate_response_structure(response.json())
+        pos = self.validate_response_structure(self._json(response))
         self.assertLessEqual(len(pos), limit, f"Should return at most {limit} results when limit={limit}")
 
         for po in pos:
             self.validate_purchase_order(po)
 
     def test_purchase_orders_have_valid_statuses(self):
-        response = self.client.get("/purchase-orders")
+        response = self.cached_get("/purchase-orders")
         self.assertEqual(response.status_code, 200)
 
-        pos = self.validate_response_structure(response.json())
+        pos = self.validate_response_structure(self._json(response))
         pos = self.validate_non_empty_data(pos, "purchase order")
 
-        for po in pos[:10]:
-            self.assertIn("status", po, f"PO {po.get('name')} missing status field")
-            self.assertIsInstance(po["status"], str, f"Status must be string for PO {po.get('name')}")
-            self.assertGreater(len(po["status"].strip()), 0, f"Status cannot be empty for PO {po.get('name')}")
+        try:
+            names, statuses = _columnize(pos[:10], ("name", "status"))
+        except KeyError as e:
+            self.fail(f"PO missing {e} field")
 
+        self.assertTrue(
+            all(isinstance(status, str) and status.strip() for status in statuses),
+            f"Status must be a non-empty string for every PO: {dict(zip(names, statuses))}"
+        )
 
+
+@unittest.skipUnless(_LIVE, _SKIP_REASON)
 class TestPurchaseOrderDetailIntegration(LocalIntegrationTestBase):
     """Integration tests for single purchase order endpoint against real ERPNext."""
 
+    @classmethod
+    def setUpClass(cls):
+        """Fetch the first PO and its detail once; the tests only read them."""
+        super().setUpClass()
+
+        cls._list_resp = cls.client.get("/purchase-orders?limit=1")
+        cls._po_name = None
+        cls._detail_resp = None
+        cls._list_fields = None
+        cls._detail_fields = None
+
+        list_data = cls._json(cls._list_resp).get("data") if cls._list_resp.status_code == 200 else None
+        if isinstance(list_data, list) and list_data and isinstance(list_data[0], dict):
+            cls._list_fields = set(list_data[0].keys())
+            cls._po_name = list_data[0].get("name")
+            if cls._po_name is not None:
+                cls._detail_resp = cls.client.get(f"/purchase-orders/{cls._po_name}")
+
+        if cls._detail_resp is not None and cls._detail_resp.status_code == 200:
+            detail_data = cls._json(cls._detail_resp).get("data")
+            if isinstance(detail_data, list) and detail_data:
+                detail_data = detail_data[0]
+            if isinstance(detail_data, dict):
+                cls._detail_fields = set(detail_data.keys())
+
     def test_purchase_order_detail_endpoint_returns_valid_data(self):
-        list_response = self.client.get("/purchase-orders?limit=1")
+        list_response = self._list_resp
         self.assertEqual(list_response.status_code, 200)
 
-        pos = self.validate_response_structure(list_response.json())
+        pos = self.validate_response_structure(self._json(list_response))
         self.assertIsInstance(pos, list, "List response data must be a list")
         pos = self.validate_non_empty_data(pos, "purchase order")
 
-        po_name = pos[0].get("name")
-        self.assertIsNotNone(po_name, "PO name cannot be None")
+        self.assertIsNotNone(self._po_name, "PO name cannot be None")
 
-        detail_response = self.client.get(f"/purchase-orders/{po_name}")
+        detail_response = self._detail_resp
         self.assertEqual(detail_response.status_code, 200)
 
-        po_data = self.validate_response_structure(detail_response.json())
+        po_data = self.validate_response_structure(self._json(detail_response))
 
         if isinstance(po_data, dict):
             po_detail = po_data
@@ -244,36 +369,39 @@ class TestPurchaseOrderDetailIntegration(LocalIntegrationTestBase):
 
         self.validate_purchase_order(po_detail)
 
-    def test_purchase_order_detail_has_more_fields_than_list(self):
-        list_response = self.client.get("/purchase-orders?limit=1")
-        self.assertEqual(list_response.status_code, 200)
-
-        list_pos = self.validate_response_structure(list_response.json())
-        self.assertIsInstance(list_pos, list, "List response data must be a list")
-        list_pos = self.validate_non_empty_data(list_pos, "purchase order")
-
-        list_po = list_pos[0]
-        po_name = list_po["name"]
-        list_po_fields = set(list_po.keys())
+    @staticmethod
+    async def _fan_out_details(names):
+        """GET the detail of every named PO concurrently."""
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.get(f"/purchase-orders/{name}") for name in names))
+
+    def test_all_details_valid(self):
+        response = self.cached_get("/purchase-orders")
+        self.assertEqual(response.status_code, 200)
 
-        detail_response = self.client.get(f"/purchase-orders/{po_name}")
-        self.assertEqual(detail_response.status_code, 200)
+        pos = self.validate_response_structure(self._json(response))
+        pos = self.validate_non_empty_data(pos, "purchase order")
 
-        po_data = self.validate_response_structure(detail_response.json())
+        names = [po["name"] for po in pos[:20]]
+        for name, detail_response in zip(names, asyncio.run(self._fan_out_details(names))):
+            self.assertEqual(detail_response.status_code, 200, f"Detail request failed for {name}")
 
-        if isinstance(po_data, dict):
-            detail_po = po_data
-        elif isinstance(po_data, list):
-            po_data = self.validate_non_empty_data(po_data, "purchase order detail")
-            detail_po = po_data[0]
-        else:
-            self.fail(f"Unexpected data type for PO detail: {type(po_data)}")
+            po_data = self.validate_response_structure(self._json(detail_response))
+            if isinstance(po_data, list):
+                po_data = self.validate_non_empty_data(po_data, "purchase order detail")[0]
+            self.validate_purchase_order(po_data)
 
-        detail_po_fields = set(detail_po.keys())
+    def test_purchase_order_detail_has_more_fields_than_list(self):
+        self.assertEqual(self._list_resp.status_code, 200)
+        self.assertIsNotNone(self._list_fields, "List response must contain at least one purchase order")
+        self.assertIsNotNone(self._detail_resp, "PO name cannot be None")
+        self.assertEqual(self._detail_resp.status_code, 200)
+        self.assertIsNotNone(self._detail_fields, "Detail response must contain a purchase order")
 
         self.assertTrue(
-            detail_po_fields >= list_po_fields,
-            f"Detail should have at least same fields as list. Missing: {list_po_fields - detail_po_fields}"
+            self._detail_fields >= self._list_fields,
+            f"Detail should have at least same fields as list. Missing: {self._list_fields - self._detail_fields}"
         )
 
 
@@ -4,15 +4,75 @@ Provides common setup and mock utilities.
 """
 
 import unittest
-from unittest.mock import patch, MagicMock
-from fastapi.testclient import TestClient
-import sys
-import os
+from dataclasses import dataclass, field
+from typing import Optional
+from unittest.mock import patch, MagicMock, Mock
 
-# Add app directory to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+from app.models import ERPNextClient
+from backend.tests._client import get_test_client
 
-from app.main import app
+try:
+    import orjson
+except ImportError:  # Optional: faster parsing of response bodies
+    orjson = None
+
+
+def make_erp_mock(**returns):
+    """
+    Mock ERPNextClient with the given method return values.
+
+    Spec'd on the real client, so calling a method it lacks fails the test.
+    """
+    client = Mock(spec=ERPNextClient)
+    for method, value in returns.items():
+        getattr(client, method).return_value = value
+    return client
+
+
+def assert_json_subset(response, expected=None, keys=()):
+    """
+    Assert a response's JSON body matches expected's values and has every key in keys.
+
+    One parse and one comparison instead of a stack of assertIn/assertEqual
+    calls; returns the parsed body for any further checks.
+    """
+    data = orjson.loads(response.content) if orjson is not None else response.json()
+    expected = expected or {}
+    actual = {key: data.get(key) for key in expected}
+    assert actual == expected, f"Expected {expected}, got {actual}"
+    missing = set(keys).difference(data)
+    assert not missing, f"Missing keys: {sorted(missing)}"
+    return data
+
+
+@dataclass
+class FakeERPClient:
+    """
+    Plain stand-in for ERPNextClient serving canned suppliers and purchase orders.
+
+    Cheaper than a Mock when a test only needs data back; use make_erp_mock
+    when the test asserts on calls. If error is set, every method raises it.
+    """
+
+    suppliers: list = field(default_factory=list)
+    purchase_orders: list = field(default_factory=list)
+    error: Optional[Exception] = None
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def list_suppliers(self):
+        self._check()
+        return self.suppliers
+
+    def list_purchase_orders(self, limit=20, filters=None, fields=None):
+        self._check()
+        return self.purchase_orders[:limit]
+
+    def get_purchase_order(self, po_name):
+        self._check()
+        return next(po for po in self.purchase_orders if po["name"] == po_name)
 
 
 class APITestBase(unittest.TestCase):
@@ -20,12 +80,8 @@ class APITestBase(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        """Set up test client once for all tests."""
-        cls.client = TestClient(app)
-
-    def setUp(self):
-        """Set up before each test."""
-        self.client = TestClient(app)
+        """Use the process-wide test client (startup events run once per process)."""
+        cls.client = get_test_client()
 
     def tearDown(self):
         """Clean up after each test."""
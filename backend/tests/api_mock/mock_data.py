@@ -1,8 +1,17 @@
 """
 Mock data for API tests.
 Plain Python variables (no pytest fixtures).
+
+Every MOCK_* value is frozen at import (read-only mappings, tuples) so no
+test can mutate data another test relies on; use fresh() for a mutable copy.
+MOCK_*_COLUMNS hold the same rows column-wise for aggregation checks.
 """
 
+from itertools import starmap
+from types import MappingProxyType
+
+import requests
+
 MOCK_SUPPLIERS = [
     {
         "name": "Supplier A",
@@ -100,10 +109,20 @@ MOCK_AI_REPORT = {
     "summary": "Cost-effective purchasing with competitive rates.",
 }
 
+# What AIReportGenerator.generate_procurement_report() returns on success
+MOCK_AI_REPORT_RESULT = {
+    "success": True,
+    **MOCK_AI_REPORT,
+    "generated_at": "2026-01-31T12:00:00",
+}
+
 MOCK_ERROR_RESPONSE = {
     "detail": "Internal server error"
 }
 
+# Exception types an ERP client call can fail with (connection, timeout, HTTP)
+MOCK_ERP_ERRORS = (Exception, ConnectionError, TimeoutError, requests.RequestException)
+
 MOCK_CUSTOMERS = [
     {
         "name": "Customer A",
@@ -188,3 +207,58 @@ MOCK_QUOTATIONS = [
     },
 ]
 
+
+def _freeze(value):
+    """Read-only view of nested dicts/lists."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def fresh(value):
+    """Mutable copy of frozen mock data (plain dicts and lists)."""
+    if isinstance(value, MappingProxyType):
+        return {k: fresh(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [fresh(v) for v in value]
+    return value
+
+
+MOCK_SUPPLIERS = _freeze(MOCK_SUPPLIERS)
+MOCK_ITEMS = _freeze(MOCK_ITEMS)
+MOCK_PURCHASE_ORDERS = _freeze(MOCK_PURCHASE_ORDERS)
+MOCK_PURCHASE_ORDER_DETAIL = _freeze(MOCK_PURCHASE_ORDER_DETAIL)
+MOCK_AI_REPORT = _freeze(MOCK_AI_REPORT)
+MOCK_AI_REPORT_RESULT = _freeze(MOCK_AI_REPORT_RESULT)
+MOCK_ERROR_RESPONSE = _freeze(MOCK_ERROR_RESPONSE)
+MOCK_CUSTOMERS = _freeze(MOCK_CUSTOMERS)
+MOCK_SALES_ORDERS = _freeze(MOCK_SALES_ORDERS)
+MOCK_INVOICES = _freeze(MOCK_INVOICES)
+MOCK_SALES_INVOICES = _freeze(MOCK_SALES_INVOICES)
+MOCK_QUOTATIONS = _freeze(MOCK_QUOTATIONS)
+
+
+# Fields shared by purchase orders built with make_purchase_orders()
+_PO_DEFAULTS = MappingProxyType({"supplier": "Supplier A", "grand_total": 5000, "status": "Submitted"})
+
+
+def make_purchase_orders(n=1, **overrides):
+    """Fresh list of n purchase orders named PO-001.., with overrides applied to every row."""
+    return [{"name": f"PO-{i:03d}", **_PO_DEFAULTS, **overrides} for i in range(1, n + 1)]
+
+
+def _columns(rows):
+    """Column-wise view of frozen rows: field -> tuple of values."""
+    return MappingProxyType({key: tuple(row[key] for row in rows) for key in rows[0]})
+
+
+def rows(columns):
+    """Iterate columnar mock data back as plain row dicts."""
+    keys = tuple(columns)
+    return starmap(lambda *values: dict(zip(keys, values)), zip(*columns.values()))
+
+
+MOCK_PO_COLUMNS = _columns(MOCK_PURCHASE_ORDERS)
+MOCK_SALES_INVOICE_COLUMNS = _columns(MOCK_SALES_INVOICES)
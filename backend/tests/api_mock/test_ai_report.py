@@ -3,62 +3,85 @@ Unittest-based API tests for AI report endpoint.
 Tests POST /ai/report using FastAPI TestClient and unittest.mock.
 """
 
+import asyncio
+import json
 import unittest
-from unittest.mock import patch, MagicMock
-from fastapi.testclient import TestClient
-import sys
+from unittest.mock import patch, MagicMock, AsyncMock
 import os
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
-
-from app.main import app
-
-
+from backend.tests._client import get_test_client
+from backend.tests.api_mock.base_test import make_erp_mock
+from backend.tests.api_mock.mock_data import MOCK_AI_REPORT, MOCK_AI_REPORT_RESULT, MOCK_ERP_ERRORS, fresh, make_purchase_orders
+from app.services.ai_report_generator import AIReportGenerator, AsyncAIReportGenerator, get_ai_report_generator
+
+# Request bodies serialized once at import; posted as raw content
+_JSON_HEADERS = {"content-type": "application/json"}
+_BODIES = {key: json.dumps(body).encode() for key, body in {
+    "generate_monthly_report": {"query": "Generate monthly report"},
+    "generate_report": {"query": "Generate report"},
+    "generate_comprehensive_report": {"query": "Generate comprehensive report"},
+    "generate_report_month": {"query": "Generate report", "period": "month"},
+    "empty": {},
+    "analyze_procurement_trends": {"query": "Analyze procurement trends"},
+}.items()}
+
+# (request body, purchase orders from ERP, generated report)
+REPORT_CASES = [
+    ("generate_monthly_report",
+     make_purchase_orders(1),
+     "Monthly procurement report shows stable performance."),
+    ("generate_comprehensive_report",
+     [{"name": "PO-001", "supplier": "Supplier A", "grand_total": 5000, "status": "Submitted"},
+      {"name": "PO-002", "supplier": "Supplier B", "grand_total": 3000, "status": "Draft"}],
+     "Analysis complete."),
+    ("analyze_procurement_trends",
+     [{"name": "PO-001", "supplier": "Supplier A", "grand_total": 5000, "status": "Completed"},
+      {"name": "PO-002", "supplier": "Supplier A", "grand_total": 3500, "status": "Submitted"},
+      {"name": "PO-003", "supplier": "Supplier B", "grand_total": 2000, "status": "Draft"}],
+     "Procurement analysis shows Supplier A is our top vendor."),
+]
+
+
+@patch('app.controllers.ai.get_client')
 class TestAIReportEndpoint(unittest.TestCase):
-    """Test AI report endpoint."""
+    """Test AI report endpoint (every test gets the patched get_client, last)."""
 
     @classmethod
     def setUpClass(cls):
         """Set up test client once for all tests."""
-        cls.client = TestClient(app)
+        cls.client = get_test_client()
 
     # ============ POST /ai/report ============
-    @patch('app.controllers.ai.get_client')
-    @patch('app.controllers.ai.AIReportGenerator')
+    @patch('app.controllers.ai.get_ai_report_generator')
     def test_ai_report_success(self, mock_report_gen, mock_get_client):
-        """Test POST /ai/report generates report successfully."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = [
-            {"name": "PO-001", "supplier": "Supplier A", "grand_total": 5000, "status": "Submitted"}
-        ]
-        mock_get_client.return_value = mock_client
-
-        mock_generator = MagicMock()
-        mock_generator.generate.return_value = "Monthly procurement report shows stable performance."
-        mock_report_gen.return_value = mock_generator
-
-        response = self.client.post(
-            "/ai/report",
-            json={"query": "Generate monthly report"}
-        )
+        """Test POST /ai/report generates a report for one or many POs."""
+        for body, pos, report in REPORT_CASES:
+            with self.subTest(body=body):
+                mock_get_client.return_value = make_erp_mock(list_purchase_orders=pos)
+
+                mock_generator = MagicMock()
+                mock_generator.generate_procurement_report.return_value = dict(fresh(MOCK_AI_REPORT_RESULT), report=report)
+                mock_report_gen.return_value = mock_generator
+
+                response = self.client.post(
+                    "/ai/report",
+                    content=_BODIES[body], headers=_JSON_HEADERS
+                )
+
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertTrue(data.get("success"))
+                self.assertEqual(data.get("intent"), "ai_report")
+                self.assertTrue(data.get("ai_generated"))
+                self.assertEqual(data["answer"], report)
 
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertTrue(data.get("success"))
-        self.assertEqual(data.get("intent"), "ai_report")
-        self.assertTrue(data.get("ai_generated"))
-        self.assertIn("answer", data)
-
-    @patch('app.controllers.ai.get_client')
     def test_ai_report_no_purchase_orders(self, mock_get_client):
         """Test POST /ai/report when no purchase orders available."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = []
-        mock_get_client.return_value = mock_client
+        mock_get_client.return_value = make_erp_mock(list_purchase_orders=[])
 
         response = self.client.post(
             "/ai/report",
-            json={"query": "Generate report"}
+            content=_BODIES["generate_report"], headers=_JSON_HEADERS
         )
 
         self.assertEqual(response.status_code, 200)
@@ -66,65 +89,35 @@ class TestAIReportEndpoint(unittest.TestCase):
         self.assertFalse(data.get("success"))
         self.assertIn("No purchase order", data.get("message", ""))
 
-    @patch('app.controllers.ai.get_client')
     def test_ai_report_erp_connection_error(self, mock_get_client):
         """Test POST /ai/report handles ERP connection errors."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.side_effect = Exception("Connection failed")
-        mock_get_client.return_value = mock_client
-
-        response = self.client.post(
-            "/ai/report",
-            json={"query": "Generate report"}
-        )
-
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertFalse(data.get("success"))
-
-    @patch('app.controllers.ai.get_client')
-    @patch('app.controllers.ai.AIReportGenerator')
-    def test_ai_report_with_summary(self, mock_report_gen, mock_get_client):
-        """Test POST /ai/report response includes summary data."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = [
-            {"name": "PO-001", "supplier": "Supplier A", "grand_total": 5000, "status": "Submitted"},
-            {"name": "PO-002", "supplier": "Supplier B", "grand_total": 3000, "status": "Draft"}
-        ]
-        mock_get_client.return_value = mock_client
-
-        mock_generator = MagicMock()
-        mock_generator.generate.return_value = "Analysis complete."
-        mock_report_gen.return_value = mock_generator
-
-        response = self.client.post(
-            "/ai/report",
-            json={"query": "Generate comprehensive report"}
-        )
-
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertTrue(data.get("success"))
-        # Response should include answer or summary with po information
-        self.assertIn("answer", data)
-
-    @patch('app.controllers.ai.get_client')
-    @patch('app.controllers.ai.AIReportGenerator')
+        for error in MOCK_ERP_ERRORS:
+            with self.subTest(error=error.__name__):
+                mock_client = make_erp_mock()
+                mock_client.list_purchase_orders.side_effect = error("Connection failed")
+                mock_get_client.return_value = mock_client
+
+                response = self.client.post(
+                    "/ai/report",
+                    content=_BODIES["generate_report"], headers=_JSON_HEADERS
+                )
+
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertFalse(data.get("success"))
+
+    @patch('app.controllers.ai.get_ai_report_generator')
     def test_ai_report_response_structure(self, mock_report_gen, mock_get_client):
         """Test POST /ai/report response has required structure."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = [
-            {"name": "PO-001", "supplier": "Supplier A", "grand_total": 5000, "status": "Submitted"}
-        ]
-        mock_get_client.return_value = mock_client
+        mock_get_client.return_value = make_erp_mock(list_purchase_orders=make_purchase_orders(1))
 
         mock_generator = MagicMock()
-        mock_generator.generate.return_value = "Report generated."
+        mock_generator.generate_procurement_report.return_value = fresh(MOCK_AI_REPORT_RESULT)
         mock_report_gen.return_value = mock_generator
 
         response = self.client.post(
             "/ai/report",
-            json={"query": "Generate report", "period": "month"}
+            content=_BODIES["generate_report_month"], headers=_JSON_HEADERS
         )
 
         self.assertEqual(response.status_code, 200)
@@ -134,43 +127,305 @@ class TestAIReportEndpoint(unittest.TestCase):
         self.assertIn("success", data)
         self.assertIn("intent", data)
         self.assertIn("ai_generated", data)
+        self.assertEqual(data["answer"], MOCK_AI_REPORT["report"])
+        self.assertEqual(data["summary"], MOCK_AI_REPORT["summary"])
 
-    @patch('app.controllers.ai.get_client')
     def test_ai_report_missing_query(self, mock_get_client):
         """Test POST /ai/report with missing query parameter."""
         response = self.client.post(
             "/ai/report",
-            json={}
+            content=_BODIES["empty"], headers=_JSON_HEADERS
         )
 
         # Should return 422 (Unprocessable Entity) for missing required field
         self.assertEqual(response.status_code, 422)
 
-    @patch('app.controllers.ai.get_client')
-    @patch('app.controllers.ai.AIReportGenerator')
-    def test_ai_report_procurement_analysis(self, mock_report_gen, mock_get_client):
-        """Test POST /ai/report with procurement analysis query."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = [
-            {"name": "PO-001", "supplier": "Supplier A", "grand_total": 5000, "status": "Completed"},
-            {"name": "PO-002", "supplier": "Supplier A", "grand_total": 3500, "status": "Submitted"},
-            {"name": "PO-003", "supplier": "Supplier B", "grand_total": 2000, "status": "Draft"}
-        ]
-        mock_get_client.return_value = mock_client
+    # ============ POST /ai/report/stream ============
+    @patch('app.controllers.ai.get_ai_report_generator')
+    def test_ai_report_stream_sends_chunks(self, mock_report_gen, mock_get_client):
+        """Test POST /ai/report/stream emits one SSE event per chunk."""
+        mock_get_client.return_value = make_erp_mock(list_purchase_orders=make_purchase_orders(1))
+        mock_report_gen.return_value.generate_procurement_report_stream.return_value = iter(
+            ["EXECUTIVE ", "SUMMARY"]
+        )
 
-        mock_generator = MagicMock()
-        mock_generator.generate.return_value = "Procurement analysis shows Supplier A is our top vendor."
-        mock_report_gen.return_value = mock_generator
+        response = self.client.post("/ai/report/stream", content=_BODIES["generate_monthly_report"], headers=_JSON_HEADERS)
 
-        response = self.client.post(
-            "/ai/report",
-            json={"query": "Analyze procurement trends"}
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        self.assertEqual(
+            response.text,
+            'data: "EXECUTIVE "\n\ndata: "SUMMARY"\n\ndata: [DONE]\n\n'
         )
 
+    def test_ai_report_stream_no_purchase_orders(self, mock_get_client):
+        """Test POST /ai/report/stream returns a JSON error without data."""
+        mock_get_client.return_value = make_erp_mock(list_purchase_orders=[])
+
+        response = self.client.post("/ai/report/stream", content=_BODIES["generate_monthly_report"], headers=_JSON_HEADERS)
+
         self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertTrue(data.get("success"))
-        self.assertEqual(data.get("intent"), "ai_report")
+        self.assertFalse(response.json().get("success"))
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
+@patch('app.services.ai_report_generator.OpenAI')
+class TestAIReportGeneratorCache(unittest.TestCase):
+    """Test report caching in AIReportGenerator."""
+
+    SUMMARY = {"po_count": 2, "total_spend": 1500.0, "top_suppliers": [["Supplier A", 1000.0]]}
+
+    def setUp(self):
+        AIReportGenerator._cache.clear()
+
+    def _mock_openai(self, mock_openai):
+        response = MagicMock()
+        response.choices[0].message.content = "EXECUTIVE SUMMARY\n\nSpend is stable."
+        mock_openai.return_value.chat.completions.create.return_value = response
+        return mock_openai.return_value.chat.completions.create
+
+    def test_identical_request_served_from_cache(self, mock_openai):
+        """Test a repeated summary+query does not call OpenAI again."""
+        create = self._mock_openai(mock_openai)
+
+        first = AIReportGenerator().generate_procurement_report(self.SUMMARY, "monthly")
+        second = AIReportGenerator().generate_procurement_report(dict(self.SUMMARY), "monthly")
+
+        self.assertTrue(first["success"])
+        first.pop("generated_at"), second.pop("generated_at")
+        self.assertEqual(first, second)
+        self.assertEqual(create.call_count, 1)
+
+    @patch('app.services.ai_report_generator.datetime')
+    def test_cache_hit_is_restamped_and_isolated(self, mock_datetime, mock_openai):
+        """Test a cache hit gets a fresh generated_at and its own nested dicts."""
+        self._mock_openai(mock_openai)
+        mock_datetime.utcnow.return_value.isoformat.side_effect = ["t1", "t2"]
+        summary = {"po_count": 2, "top_suppliers": [["Supplier A", 1000.0]]}
+
+        first = AIReportGenerator().generate_procurement_report(summary, "monthly")
+        first["summary"]["po_count"] = 99
+        first["sections"].clear()
+        summary["top_suppliers"].append(["Supplier B", 1.0])
+        second = AIReportGenerator().generate_procurement_report({"po_count": 2, "top_suppliers": [["Supplier A", 1000.0]]}, "monthly")
+
+        self.assertEqual((first["generated_at"], second["generated_at"]), ("t1", "t2"))
+        self.assertEqual(second["summary"], {"po_count": 2, "top_suppliers": [["Supplier A", 1000.0]]})
+        self.assertTrue(second["sections"])
+        self.assertEqual(second["metrics"]["supplier_count"], 1)
+
+    def test_different_query_and_invalidate_miss_cache(self, mock_openai):
+        """Test a new query or an invalidated entry triggers a fresh call."""
+        create = self._mock_openai(mock_openai)
+        generator = AIReportGenerator()
+
+        generator.generate_procurement_report(self.SUMMARY, "monthly")
+        generator.generate_procurement_report(self.SUMMARY, "quarterly")
+        generator.invalidate(self.SUMMARY, "monthly")
+        generator.generate_procurement_report(self.SUMMARY, "monthly")
+
+        self.assertEqual(create.call_count, 3)
+
+    def test_model_and_token_cap_from_environment(self, mock_openai):
+        """Test COPILOT_MODEL / COPILOT_MAX_TOKENS are passed to OpenAI."""
+        create = self._mock_openai(mock_openai)
+
+        with patch.dict(os.environ, {"COPILOT_MODEL": "gpt-3.5-turbo", "COPILOT_MAX_TOKENS": "800"}):
+            AIReportGenerator().generate_procurement_report(self.SUMMARY, "monthly")
+
+        self.assertEqual(create.call_args.kwargs["model"], "gpt-3.5-turbo")
+        self.assertEqual(create.call_args.kwargs["max_tokens"], 800)
+        self.assertEqual(AIReportGenerator().model, "gpt-4o-mini")
+
+    def test_shared_generator_reuses_one_pooled_client(self, mock_openai):
+        """Test get_ai_report_generator returns one instance with a pooled HTTP client."""
+        get_ai_report_generator.cache_clear()
+        try:
+            self.assertIs(get_ai_report_generator(), get_ai_report_generator())
+            self.assertEqual(mock_openai.call_count, 1)
+            self.assertIsNotNone(mock_openai.call_args.kwargs["http_client"])
+        finally:
+            get_ai_report_generator.cache_clear()
+
+    def test_stream_yields_deltas_and_caches_report(self, mock_openai):
+        """Test streamed deltas are yielded and the joined report is cached."""
+        chunks = []
+        for text in ["EXECUTIVE ", None, "SUMMARY"]:
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = text
+            chunks.append(chunk)
+        create = mock_openai.return_value.chat.completions.create
+        create.return_value = iter(chunks)
+        generator = AIReportGenerator()
+
+        streamed = list(generator.generate_procurement_report_stream(self.SUMMARY, "monthly"))
+        cached = generator.generate_procurement_report(self.SUMMARY, "monthly")
+
+        self.assertEqual(streamed, ["EXECUTIVE ", "SUMMARY"])
+        self.assertEqual(cached["report"], "EXECUTIVE SUMMARY")
+        self.assertEqual(create.call_count, 1)
+        self.assertTrue(create.call_args.kwargs["stream"])
+
+
+class TestReportSectionParsing(unittest.TestCase):
+    """Test splitting generated reports into display sections."""
+
+    def test_headers_map_to_sections_without_dropping_content(self):
+        """Test every prompt header lands in a section and nothing is lost."""
+        report = ("**EXECUTIVE SUMMARY**\nSpend rose.\n\nKEY METRICS:\n- Total: $10\n\n"
+                  "SPENDING ANALYSIS\nA\n\nSUPPLIER PERFORMANCE\nB\n\n"
+                  "ORDER STATUS REVIEW\nC\n\nRECOMMENDATIONS\n1. One\n\n2. Two")
+
+        sections = AIReportGenerator._parse_report_sections(report)
+
+        self.assertIn("KEY METRICS", sections["overview"])
+        self.assertIn("SUPPLIER PERFORMANCE\nB", sections["analysis"])
+        self.assertEqual(sections["trends"], "ORDER STATUS REVIEW\nC")
+        self.assertEqual(sections["recommendation"], "RECOMMENDATIONS\n1. One\n\n2. Two")
+
+    def test_reports_without_headers_fall_back_to_paragraphs(self):
+        """Test header-less reports keep paragraphs beyond the fourth."""
+        sections = AIReportGenerator._parse_report_sections("a\n\nb\n\nc\n\nd\n\ne")
+
+        self.assertEqual(sections, {"overview": "a", "analysis": "b", "trends": "c", "recommendation": "d\n\ne"})
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
+@patch('app.services.ai_report_generator.OpenAI')
+class TestAIReportGeneratorBatch(unittest.TestCase):
+    """Test batched report generation."""
+
+    SUMMARIES = [{"po_count": 1, "total_spend": 100.0}, {"po_count": 2, "total_spend": 250.0}]
+
+    def setUp(self):
+        AIReportGenerator._cache.clear()
+
+    def _mock_openai(self, mock_openai, contents):
+        responses = []
+        for content in contents:
+            response = MagicMock()
+            response.choices[0].message.content = content
+            responses.append(response)
+        create = mock_openai.return_value.chat.completions.create
+        create.side_effect = responses
+        return create
+
+    def test_reports_mapped_back_by_index(self, mock_openai):
+        """Test one batched call returns one report per summary in order."""
+        create = self._mock_openai(mock_openai, ['{"reports": ["Report one", "Report two"]}'])
+
+        results = AIReportGenerator().generate_procurement_reports(self.SUMMARIES)
+
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual([r["report"] for r in results], ["Report one", "Report two"])
+        self.assertEqual(results[1]["summary"], self.SUMMARIES[1])
+
+    def test_malformed_batch_falls_back_to_single_calls(self, mock_openai):
+        """Test a batch with the wrong shape is retried one summary at a time."""
+        create = self._mock_openai(mock_openai, ['{"reports": ["Only one"]}', "Single one", "Single two"])
+
+        results = AIReportGenerator().generate_procurement_reports(self.SUMMARIES)
+
+        self.assertEqual(create.call_count, 3)
+        self.assertEqual([r["report"] for r in results], ["Single one", "Single two"])
+
+    def test_large_batches_split_within_token_cap(self, mock_openai):
+        """Test summaries are grouped so no call asks for more than the batch token cap."""
+        summaries = [{"po_count": n, "total_spend": 100.0 * n} for n in range(1, 6)]
+        create = self._mock_openai(mock_openai, [
+            '{"reports": ["R1", "R2"]}', '{"reports": ["R3", "R4"]}', "R5"
+        ])
+
+        results = AIReportGenerator().generate_procurement_reports(summaries)
+
+        self.assertEqual(create.call_count, 3)
+        self.assertEqual([r["report"] for r in results], ["R1", "R2", "R3", "R4", "R5"])
+        for call in create.call_args_list:
+            with self.subTest(max_tokens=call.kwargs["max_tokens"]):
+                self.assertLessEqual(call.kwargs["max_tokens"], 4096)
+
+    def test_batch_api_submit_and_collect(self, mock_openai):
+        """Test Batch API requests are uploaded as JSONL and results come back in order."""
+        client = mock_openai.return_value
+        client.files.create.return_value.id = "file-in"
+        client.batches.create.return_value.id = "batch-1"
+        generator = AIReportGenerator()
+
+        batch_id = generator.submit_batch_reports(self.SUMMARIES)
+
+        self.assertEqual(batch_id, "batch-1")
+        uploaded = client.files.create.call_args.kwargs["file"][1].decode().splitlines()
+        self.assertEqual([json.loads(line)["custom_id"] for line in uploaded], ["report-0", "report-1"])
+
+        client.batches.retrieve.return_value.status = "in_progress"
+        self.assertIsNone(generator.collect_batch(batch_id, self.SUMMARIES))
+
+        client.batches.retrieve.return_value.status = "completed"
+        client.files.content.return_value.text = json.dumps({
+            "custom_id": "report-1",
+            "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "Report two"}}]}}
+        })
+        results = generator.collect_batch(batch_id, self.SUMMARIES)
+
+        self.assertFalse(results[0]["success"])
+        self.assertEqual(results[1]["report"], "Report two")
+        self.assertEqual(generator.generate_procurement_report(self.SUMMARIES[1])["report"], "Report two")
+        client.chat.completions.create.assert_not_called()
+
+
+
+class _FakeRateLimitError(Exception):
+    """Stand-in for openai.RateLimitError, which needs a real HTTP response."""
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
+@patch('app.services.ai_report_generator.AsyncOpenAI')
+class TestAsyncAIReportGenerator(unittest.TestCase):
+    """Test concurrent report generation."""
+
+    def setUp(self):
+        AIReportGenerator._cache.clear()
+
+    @staticmethod
+    def _response(content):
+        response = MagicMock()
+        response.choices[0].message.content = content
+        return response
+
+    def test_arun_many_preserves_submission_order(self, mock_async_openai):
+        """Test results come back in the order summaries were submitted."""
+        async def create(**kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            # Later inputs finish first
+            await asyncio.sleep(0.01 if "Orders: 1" in prompt else 0)
+            return self._response(prompt.split("Total Purchase Orders: ")[1].split("\n")[0])
+
+        mock_async_openai.return_value.chat.completions.create = create
+        summaries = [{"po_count": 1}, {"po_count": 2}, {"po_count": 3}]
+
+        results = asyncio.run(AsyncAIReportGenerator().arun_many(summaries, rpm=6000))
+
+        self.assertEqual([r["report"] for r in results], ["1", "2", "3"])
+
+    def test_arun_many_rejects_mismatched_queries(self, mock_async_openai):
+        """Test a queries list shorter than summaries raises instead of dropping summaries."""
+        generator = AsyncAIReportGenerator()
+
+        with self.assertRaises(ValueError):
+            asyncio.run(generator.arun_many([{"po_count": 1}, {"po_count": 2}], queries=["Q"]))
+        mock_async_openai.return_value.chat.completions.create.assert_not_called()
+
+    @patch('app.services.ai_report_generator.random.uniform', return_value=0)
+    @patch('app.services.ai_report_generator.RateLimitError', _FakeRateLimitError)
+    def test_rate_limit_is_retried(self, _uniform, mock_async_openai):
+        """Test a rate-limited call is retried and then succeeds."""
+        create = AsyncMock(side_effect=[_FakeRateLimitError("rate limit"), self._response("Report")])
+        mock_async_openai.return_value.chat.completions.create = create
+
+        result = asyncio.run(AsyncAIReportGenerator().agenerate_procurement_report({"po_count": 1}))
+
+        self.assertTrue(result["success"])
+        self.assertEqual(create.await_count, 2)
 
 
 if __name__ == "__main__":
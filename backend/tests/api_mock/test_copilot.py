@@ -4,54 +4,55 @@ Tests the main POST /copilot/ask endpoint using FastAPI TestClient and unittest.
 """
 
 import unittest
-from unittest.mock import patch, MagicMock
-from fastapi.testclient import TestClient
-import sys
-import os
+from unittest.mock import patch, DEFAULT
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+from backend.tests._client import get_test_client
+from backend.tests.api_mock.base_test import FakeERPClient, assert_json_subset
+from backend.tests.api_mock.mock_data import MOCK_ERP_ERRORS, make_purchase_orders
 
-from app.main import app
+# Keys every /copilot/ask response carries
+_REQUIRED_KEYS = ("intent", "answer", "data", "insights", "next_questions")
 
+# (query, expected intent, FakeERPClient data)
+INTENT_CASES = [
+    ("Show me all suppliers", "list_suppliers",
+     {"suppliers": [{"name": "Supplier A", "supplier_name": "Supplier A"}]}),
+    ("Show delayed orders", "detect_delayed_orders",
+     {"purchase_orders": [{"name": "PO-001", "status": "Pending", "transaction_date": "2024-01-01"}]}),
+    ("Find price anomalies", "detect_price_anomalies",
+     {"purchase_orders": [{"name": "PO-001", "item_code": "ITEM-1", "rate": 100, "qty": 10}]}),
+    ("Analyze PO risks", "analyze_po_risks", {"purchase_orders": make_purchase_orders(1)}),
+    ("", "unknown", {}),
+]
 
+
+@patch.multiple('app.copilot.service', get_shared_client=DEFAULT)
 class TestCopilotEndpoint(unittest.TestCase):
-    """Test copilot endpoint."""
+    """Test copilot endpoint (every test gets the patched get_shared_client)."""
 
     @classmethod
     def setUpClass(cls):
         """Set up test client once for all tests."""
-        cls.client = TestClient(app)
+        cls.client = get_test_client()
 
     # ============ POST /copilot/ask ============
-    @patch('app.copilot.service.ERPNextClient')
-    def test_copilot_ask_list_suppliers(self, mock_erpnext_client):
-        """Test POST /copilot/ask with list_suppliers intent."""
-        mock_client = MagicMock()
-        mock_client.list_suppliers.return_value = [
-            {"name": "Supplier A", "supplier_name": "Supplier A"}
-        ]
-        mock_erpnext_client.return_value = mock_client
+    def test_copilot_ask_intents(self, get_shared_client):
+        """Test POST /copilot/ask routes each query to its intent."""
+        for query, intent, erp_data in INTENT_CASES:
+            with self.subTest(intent=intent):
+                get_shared_client.return_value = FakeERPClient(**erp_data)
 
-        response = self.client.post(
-            "/copilot/ask",
-            json={"query": "Show me all suppliers"}
-        )
+                response = self.client.post(
+                    "/copilot/ask",
+                    json={"query": query}
+                )
 
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertIn("intent", data)
-        self.assertIn("answer", data)
-        self.assertIn("data", data)
-        self.assertEqual(data["intent"], "list_suppliers")
-
-    @patch('app.copilot.service.ERPNextClient')
-    def test_copilot_ask_list_purchase_orders(self, mock_erpnext_client):
+                self.assertEqual(response.status_code, 200)
+                assert_json_subset(response, {"intent": intent}, keys=_REQUIRED_KEYS)
+
+    def test_copilot_ask_list_purchase_orders(self, get_shared_client):
         """Test POST /copilot/ask with list_purchase_orders intent."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = [
-            {"name": "PO-001", "supplier": "Supplier A", "grand_total": 5000}
-        ]
-        mock_erpnext_client.return_value = mock_client
+        get_shared_client.return_value = FakeERPClient(purchase_orders=make_purchase_orders(1))
 
         with patch('app.copilot.service.build_purchase_order_insights') as mock_insights:
             mock_insights.return_value = {
@@ -64,19 +65,14 @@ class TestCopilotEndpoint(unittest.TestCase):
             )
 
         self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["intent"], "list_purchase_orders")
-        self.assertIn("answer", data)
+        assert_json_subset(response, {"intent": "list_purchase_orders"}, keys=("answer",))
 
-    @patch('app.copilot.service.ERPNextClient')
-    def test_copilot_ask_total_spend(self, mock_erpnext_client):
+    def test_copilot_ask_total_spend(self, get_shared_client):
         """Test POST /copilot/ask with total_spend intent."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = [
+        get_shared_client.return_value = FakeERPClient(purchase_orders=[
             {"name": "PO-001", "grand_total": 5000},
             {"name": "PO-002", "grand_total": 3000},
-        ]
-        mock_erpnext_client.return_value = mock_client
+        ])
 
         with patch('app.copilot.service.build_purchase_order_insights') as mock_insights:
             mock_insights.return_value = {
@@ -91,74 +87,16 @@ class TestCopilotEndpoint(unittest.TestCase):
             )
 
         self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["intent"], "total_spend")
+        data = assert_json_subset(response, {"intent": "total_spend"})
         self.assertIn("$8,000.00", data["answer"])
 
-    @patch('app.copilot.service.ERPNextClient')
-    def test_copilot_ask_detect_delayed_orders(self, mock_erpnext_client):
-        """Test POST /copilot/ask with detect_delayed_orders intent."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = [
-            {"name": "PO-001", "status": "Pending", "transaction_date": "2024-01-01"}
-        ]
-        mock_erpnext_client.return_value = mock_client
-
-        response = self.client.post(
-            "/copilot/ask",
-            json={"query": "Show delayed orders"}
-        )
-
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["intent"], "detect_delayed_orders")
-
-    @patch('app.copilot.service.ERPNextClient')
-    def test_copilot_ask_detect_price_anomalies(self, mock_erpnext_client):
-        """Test POST /copilot/ask with detect_price_anomalies intent."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = [
-            {"name": "PO-001", "item_code": "ITEM-1", "rate": 100, "qty": 10}
-        ]
-        mock_erpnext_client.return_value = mock_client
-
-        response = self.client.post(
-            "/copilot/ask",
-            json={"query": "Find price anomalies"}
-        )
-
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["intent"], "detect_price_anomalies")
-
-    @patch('app.copilot.service.ERPNextClient')
-    def test_copilot_ask_analyze_po_risks(self, mock_erpnext_client):
-        """Test POST /copilot/ask with analyze_po_risks intent."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = [
-            {"name": "PO-001", "supplier": "Supplier A", "grand_total": 5000}
-        ]
-        mock_erpnext_client.return_value = mock_client
-
-        response = self.client.post(
-            "/copilot/ask",
-            json={"query": "Analyze PO risks"}
-        )
-
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["intent"], "analyze_po_risks")
-
-    @patch('app.copilot.service.ERPNextClient')
-    def test_copilot_ask_approve_po(self, mock_erpnext_client):
+    def test_copilot_ask_approve_po(self, get_shared_client):
         """Test POST /copilot/ask with approve_po intent."""
-        mock_client = MagicMock()
-        mock_client.get_purchase_order.return_value = {
+        get_shared_client.return_value = FakeERPClient(purchase_orders=[{
             "name": "PO-001",
             "supplier": "Supplier A",
             "grand_total": 5000
-        }
-        mock_erpnext_client.return_value = mock_client
+        }])
 
         with patch('app.copilot.service.analyze_po_approval') as mock_analyze:
             mock_analyze.return_value = {
@@ -171,21 +109,9 @@ class TestCopilotEndpoint(unittest.TestCase):
             )
 
         self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["intent"], "approve_po")
+        assert_json_subset(response, {"intent": "approve_po"})
 
-    def test_copilot_ask_empty_query(self):
-        """Test POST /copilot/ask with empty query."""
-        response = self.client.post(
-            "/copilot/ask",
-            json={"query": ""}
-        )
-
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["intent"], "unknown")
-
-    def test_copilot_ask_missing_query_parameter(self):
+    def test_copilot_ask_missing_query_parameter(self, get_shared_client):
         """Test POST /copilot/ask with missing query parameter."""
         response = self.client.post(
             "/copilot/ask",
@@ -195,38 +121,30 @@ class TestCopilotEndpoint(unittest.TestCase):
         # Should return 422 (Unprocessable Entity) for missing required field
         self.assertEqual(response.status_code, 422)
 
-    @patch('app.copilot.service.ERPNextClient')
-    def test_copilot_ask_erp_connection_error(self, mock_erpnext_client):
+    def test_copilot_ask_erp_connection_error(self, get_shared_client):
         """Test POST /copilot/ask handles ERP connection errors."""
-        mock_client = MagicMock()
-        mock_client.list_suppliers.side_effect = Exception("Connection failed")
-        mock_erpnext_client.return_value = mock_client
+        for error in MOCK_ERP_ERRORS:
+            with self.subTest(error=error.__name__):
+                get_shared_client.return_value = FakeERPClient(error=error("Connection failed"))
 
-        response = self.client.post(
-            "/copilot/ask",
-            json={"query": "Show suppliers"}
-        )
+                response = self.client.post(
+                    "/copilot/ask",
+                    json={"query": "Show suppliers"}
+                )
 
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertIn("answer", data)
+                self.assertEqual(response.status_code, 200)
+                assert_json_subset(response, keys=("answer",))
 
-    def test_copilot_ask_response_structure(self):
+    def test_copilot_ask_response_structure(self, get_shared_client):
         """Test POST /copilot/ask response has required fields."""
-        with patch('app.copilot.service.ERPNextClient') as mock_erpnext_client:
-            mock_client = MagicMock()
-            mock_client.list_suppliers.return_value = []
-            mock_erpnext_client.return_value = mock_client
+        get_shared_client.return_value = FakeERPClient()
 
-            response = self.client.post(
-                "/copilot/ask",
-                json={"query": "Show suppliers"}
-            )
+        response = self.client.post(
+            "/copilot/ask",
+            json={"query": "Show suppliers"}
+        )
 
-        data = response.json()
-        required_keys = ["intent", "answer", "data", "insights", "next_questions"]
-        for key in required_keys:
-            self.assertIn(key, data, f"Missing required key: {key}")
+        assert_json_subset(response, keys=_REQUIRED_KEYS)
 
 
 if __name__ == "__main__":
@@ -4,14 +4,12 @@ Tests all 11 data endpoints using FastAPI TestClient and unittest.mock.
 """
 
 import unittest
-from unittest.mock import patch, MagicMock
-from fastapi.testclient import TestClient
-import sys
-import os
+from unittest.mock import patch
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
-
-from app.main import app
+from app.controllers import ai, data
+from app.models.erp_client import get_shared_client
+from backend.tests._client import get_test_client
+from backend.tests.api_mock.base_test import make_erp_mock
 from backend.tests.api_mock.mock_data import (
     MOCK_SUPPLIERS,
     MOCK_ITEMS,
@@ -21,32 +19,27 @@ from backend.tests.api_mock.mock_data import (
     MOCK_SALES_INVOICES,
     MOCK_CUSTOMERS,
     MOCK_QUOTATIONS,
+    MOCK_PO_COLUMNS,
+    MOCK_SALES_INVOICE_COLUMNS,
+    MOCK_ERP_ERRORS,
+    fresh,
+    rows,
 )
 
 
+@patch('app.controllers.data.get_client')
 class TestDataEndpoints(unittest.TestCase):
-    """Test all data endpoints."""
+    """Test all data endpoints (every test gets the patched get_client)."""
 
     @classmethod
     def setUpClass(cls):
         """Set up test client once for all tests."""
-        cls.client = TestClient(app)
-
-    def setUp(self):
-        """Set up before each test - create fresh mocks."""
-        self.mock_client_patcher = patch('app.controllers.data.get_client')
-        self.mock_get_client = self.mock_client_patcher.start()
-
-    def tearDown(self):
-        """Clean up after each test."""
-        self.mock_client_patcher.stop()
+        cls.client = get_test_client()
 
     # ============ GET /suppliers ============
-    @patch('app.controllers.data.get_client')
     def test_get_suppliers_success(self, mock_get_client):
         """Test GET /suppliers returns supplier list."""
-        mock_client = MagicMock()
-        mock_client.list_suppliers.return_value = MOCK_SUPPLIERS
+        mock_client = make_erp_mock(list_suppliers=fresh(MOCK_SUPPLIERS))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/suppliers")
@@ -57,11 +50,9 @@ class TestDataEndpoints(unittest.TestCase):
         self.assertEqual(len(data["data"]), 3)
         self.assertEqual(data["data"][0]["name"], "Supplier A")
 
-    @patch('app.controllers.data.get_client')
     def test_get_suppliers_empty_list(self, mock_get_client):
         """Test GET /suppliers with empty list."""
-        mock_client = MagicMock()
-        mock_client.list_suppliers.return_value = []
+        mock_client = make_erp_mock(list_suppliers=[])
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/suppliers")
@@ -70,23 +61,22 @@ class TestDataEndpoints(unittest.TestCase):
         data = response.json()
         self.assertEqual(len(data["data"]), 0)
 
-    @patch('app.controllers.data.get_client')
     def test_get_suppliers_error(self, mock_get_client):
         """Test GET /suppliers error handling."""
-        mock_client = MagicMock()
-        mock_client.list_suppliers.side_effect = Exception("Connection failed")
-        mock_get_client.return_value = mock_client
+        for error in MOCK_ERP_ERRORS:
+            with self.subTest(error=error.__name__):
+                mock_client = make_erp_mock()
+                mock_client.list_suppliers.side_effect = error("Connection failed")
+                mock_get_client.return_value = mock_client
 
-        response = self.client.get("/suppliers")
+                response = self.client.get("/suppliers")
 
-        self.assertEqual(response.status_code, 500)
+                self.assertEqual(response.status_code, 500)
 
     # ============ GET /items ============
-    @patch('app.controllers.data.get_client')
     def test_get_items_success(self, mock_get_client):
         """Test GET /items returns item list."""
-        mock_client = MagicMock()
-        mock_client.list_items.return_value = MOCK_ITEMS
+        mock_client = make_erp_mock(list_items=fresh(MOCK_ITEMS))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/items")
@@ -97,23 +87,22 @@ class TestDataEndpoints(unittest.TestCase):
         self.assertEqual(len(data["data"]), 2)
         self.assertEqual(data["data"][0]["item_code"], "Item-001")
 
-    @patch('app.controllers.data.get_client')
     def test_get_items_error(self, mock_get_client):
         """Test GET /items error handling."""
-        mock_client = MagicMock()
-        mock_client.list_items.side_effect = Exception("DB error")
-        mock_get_client.return_value = mock_client
+        for error in MOCK_ERP_ERRORS:
+            with self.subTest(error=error.__name__):
+                mock_client = make_erp_mock()
+                mock_client.list_items.side_effect = error("DB error")
+                mock_get_client.return_value = mock_client
 
-        response = self.client.get("/items")
+                response = self.client.get("/items")
 
-        self.assertEqual(response.status_code, 500)
+                self.assertEqual(response.status_code, 500)
 
     # ============ GET /purchase-orders ============
-    @patch('app.controllers.data.get_client')
     def test_get_purchase_orders_success(self, mock_get_client):
         """Test GET /purchase-orders returns PO list."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = MOCK_PURCHASE_ORDERS
+        mock_client = make_erp_mock(list_purchase_orders=fresh(MOCK_PURCHASE_ORDERS))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/purchase-orders")
@@ -123,37 +112,77 @@ class TestDataEndpoints(unittest.TestCase):
         self.assertIn("data", data)
         self.assertEqual(len(data["data"]), 3)
         self.assertEqual(data["data"][0]["name"], "PO-2024-001")
+        self.assertEqual(sum(po["grand_total"] for po in data["data"]), sum(MOCK_PO_COLUMNS["grand_total"]))
 
-    @patch('app.controllers.data.get_client')
     def test_get_purchase_orders_with_limit(self, mock_get_client):
         """Test GET /purchase-orders with limit parameter."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.return_value = MOCK_PURCHASE_ORDERS[:1]
+        mock_client = make_erp_mock(list_purchase_orders=fresh(MOCK_PURCHASE_ORDERS[:1]))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/purchase-orders?limit=1")
 
         self.assertEqual(response.status_code, 200)
         data = response.json()
-        mock_client.list_purchase_orders.assert_called_with(1)
+        mock_client.list_purchase_orders.assert_any_call(1)
 
-    @patch('app.controllers.data.get_client')
     def test_get_purchase_orders_error(self, mock_get_client):
         """Test GET /purchase-orders error handling."""
-        mock_client = MagicMock()
-        mock_client.list_purchase_orders.side_effect = Exception("ERP unavailable")
+        for error in MOCK_ERP_ERRORS:
+            with self.subTest(error=error.__name__):
+                mock_client = make_erp_mock()
+                mock_client.list_purchase_orders.side_effect = error("ERP unavailable")
+                mock_get_client.return_value = mock_client
+
+                response = self.client.get("/purchase-orders")
+
+                self.assertEqual(response.status_code, 500)
+
+    # ============ Conditional GET (ETag) ============
+    def test_get_suppliers_sets_etag(self, mock_get_client):
+        """Test GET /suppliers returns an ETag header."""
+        mock_client = make_erp_mock(list_suppliers=fresh(MOCK_SUPPLIERS))
         mock_get_client.return_value = mock_client
 
-        response = self.client.get("/purchase-orders")
+        response = self.client.get("/suppliers")
 
-        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("etag", response.headers)
+
+    def test_get_purchase_orders_not_modified(self, mock_get_client):
+        """Test GET /purchase-orders returns 304 when If-None-Match matches."""
+        mock_client = make_erp_mock(list_purchase_orders=fresh(MOCK_PURCHASE_ORDERS))
+        mock_get_client.return_value = mock_client
+
+        with patch('app.controllers.data.prefetch_rates') as mock_prefetch:
+            first = self.client.get("/purchase-orders")
+            etag = first.headers["etag"]
+            mock_prefetch.assert_called_once_with(mock_client)
+
+            response = self.client.get("/purchase-orders", headers={"If-None-Match": etag})
+            mock_prefetch.assert_called_once()
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["etag"], etag)
+
+    def test_get_items_etag_changes_with_data(self, mock_get_client):
+        """Test GET /items returns 200 when the cached ETag is stale."""
+        mock_client = make_erp_mock(list_items=fresh(MOCK_ITEMS))
+        mock_get_client.return_value = mock_client
+
+        etag = self.client.get("/items").headers["etag"]
+        mock_client.list_items.return_value = fresh(MOCK_ITEMS[:1])
+
+        response = self.client.get("/items", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+        self.assertEqual(len(response.json()["data"]), 1)
 
     # ============ GET /purchase-orders/{po_name} ============
-    @patch('app.controllers.data.get_client')
     def test_get_purchase_order_by_name(self, mock_get_client):
         """Test GET /purchase-orders/{po_name} returns PO details."""
-        mock_client = MagicMock()
-        mock_client.get_purchase_order.return_value = MOCK_PURCHASE_ORDER_DETAIL
+        mock_client = make_erp_mock(get_purchase_order=fresh(MOCK_PURCHASE_ORDER_DETAIL))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/purchase-orders/PO-2024-001")
@@ -165,10 +194,9 @@ class TestDataEndpoints(unittest.TestCase):
         self.assertEqual(data["data"]["supplier"], "Supplier A")
         mock_client.get_purchase_order.assert_called_with("PO-2024-001")
 
-    @patch('app.controllers.data.get_client')
     def test_get_purchase_order_not_found(self, mock_get_client):
         """Test GET /purchase-orders/{po_name} when PO not found."""
-        mock_client = MagicMock()
+        mock_client = make_erp_mock()
         mock_client.get_purchase_order.side_effect = Exception("Not found")
         mock_get_client.return_value = mock_client
 
@@ -177,11 +205,9 @@ class TestDataEndpoints(unittest.TestCase):
         self.assertEqual(response.status_code, 500)
 
     # ============ GET /customers ============
-    @patch('app.controllers.data.get_client')
     def test_get_customers_success(self, mock_get_client):
         """Test GET /customers returns customer list."""
-        mock_client = MagicMock()
-        mock_client.list_customers.return_value = MOCK_CUSTOMERS
+        mock_client = make_erp_mock(list_customers=fresh(MOCK_CUSTOMERS))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/customers")
@@ -191,11 +217,9 @@ class TestDataEndpoints(unittest.TestCase):
         self.assertIn("data", data)
         self.assertEqual(len(data["data"]), 2)
 
-    @patch('app.controllers.data.get_client')
     def test_get_customers_with_limit(self, mock_get_client):
         """Test GET /customers with limit parameter."""
-        mock_client = MagicMock()
-        mock_client.list_customers.return_value = MOCK_CUSTOMERS[:1]
+        mock_client = make_erp_mock(list_customers=fresh(MOCK_CUSTOMERS[:1]))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/customers?limit=1")
@@ -204,11 +228,9 @@ class TestDataEndpoints(unittest.TestCase):
         mock_client.list_customers.assert_called_with(1)
 
     # ============ GET /sales-orders ============
-    @patch('app.controllers.data.get_client')
     def test_get_sales_orders_success(self, mock_get_client):
         """Test GET /sales-orders returns sales order list."""
-        mock_client = MagicMock()
-        mock_client.list_sales_orders.return_value = MOCK_SALES_ORDERS
+        mock_client = make_erp_mock(list_sales_orders=fresh(MOCK_SALES_ORDERS))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/sales-orders")
@@ -218,11 +240,9 @@ class TestDataEndpoints(unittest.TestCase):
         self.assertIn("data", data)
         self.assertGreater(len(data["data"]), 0)
 
-    @patch('app.controllers.data.get_client')
     def test_get_sales_orders_with_limit(self, mock_get_client):
         """Test GET /sales-orders with limit parameter."""
-        mock_client = MagicMock()
-        mock_client.list_sales_orders.return_value = MOCK_SALES_ORDERS
+        mock_client = make_erp_mock(list_sales_orders=fresh(MOCK_SALES_ORDERS))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/sales-orders?limit=25")
@@ -231,10 +251,9 @@ class TestDataEndpoints(unittest.TestCase):
         mock_client.list_sales_orders.assert_called_with(25)
 
     # ============ GET /sales-orders/{so_name} ============
-    @patch('app.controllers.data.get_client')
     def test_get_sales_order_by_name(self, mock_get_client):
         """Test GET /sales-orders/{so_name} returns SO details."""
-        mock_client = MagicMock()
+        mock_client = make_erp_mock()
         mock_so = {"name": "SO-2024-001", "customer": "Customer A", "grand_total": 5000}
         mock_client.get_sales_order.return_value = mock_so
         mock_get_client.return_value = mock_client
@@ -247,11 +266,9 @@ class TestDataEndpoints(unittest.TestCase):
         mock_client.get_sales_order.assert_called_with("SO-2024-001")
 
     # ============ GET /sales-invoices ============
-    @patch('app.controllers.data.get_client')
     def test_get_sales_invoices_success(self, mock_get_client):
         """Test GET /sales-invoices returns invoice list."""
-        mock_client = MagicMock()
-        mock_client.list_sales_invoices.return_value = MOCK_SALES_INVOICES
+        mock_client = make_erp_mock(list_sales_invoices=fresh(MOCK_SALES_INVOICES))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/sales-invoices")
@@ -260,12 +277,15 @@ class TestDataEndpoints(unittest.TestCase):
         data = response.json()
         self.assertIn("data", data)
         self.assertGreater(len(data["data"]), 0)
+        self.assertEqual(data["data"], list(rows(MOCK_SALES_INVOICE_COLUMNS)))
+        self.assertEqual(
+            sum(si["outstanding_amount"] for si in data["data"]),
+            sum(MOCK_SALES_INVOICE_COLUMNS["outstanding_amount"]),
+        )
 
-    @patch('app.controllers.data.get_client')
     def test_get_sales_invoices_with_limit(self, mock_get_client):
         """Test GET /sales-invoices with limit parameter."""
-        mock_client = MagicMock()
-        mock_client.list_sales_invoices.return_value = MOCK_SALES_INVOICES
+        mock_client = make_erp_mock(list_sales_invoices=fresh(MOCK_SALES_INVOICES))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/sales-invoices?limit=10")
@@ -274,10 +294,9 @@ class TestDataEndpoints(unittest.TestCase):
         mock_client.list_sales_invoices.assert_called_with(10)
 
     # ============ GET /sales-invoices/{si_name} ============
-    @patch('app.controllers.data.get_client')
     def test_get_sales_invoice_by_name(self, mock_get_client):
         """Test GET /sales-invoices/{si_name} returns invoice details."""
-        mock_client = MagicMock()
+        mock_client = make_erp_mock()
         mock_si = {"name": "SI-2024-001", "customer": "Customer A", "grand_total": 3000}
         mock_client.get_sales_invoice.return_value = mock_si
         mock_get_client.return_value = mock_client
@@ -290,11 +309,9 @@ class TestDataEndpoints(unittest.TestCase):
         mock_client.get_sales_invoice.assert_called_with("SI-2024-001")
 
     # ============ GET /quotations ============
-    @patch('app.controllers.data.get_client')
     def test_get_quotations_success(self, mock_get_client):
         """Test GET /quotations returns quotation list."""
-        mock_client = MagicMock()
-        mock_client.list_quotations.return_value = MOCK_QUOTATIONS
+        mock_client = make_erp_mock(list_quotations=fresh(MOCK_QUOTATIONS))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/quotations")
@@ -304,11 +321,9 @@ class TestDataEndpoints(unittest.TestCase):
         self.assertIn("data", data)
         self.assertGreater(len(data["data"]), 0)
 
-    @patch('app.controllers.data.get_client')
     def test_get_quotations_with_limit(self, mock_get_client):
         """Test GET /quotations with limit parameter."""
-        mock_client = MagicMock()
-        mock_client.list_quotations.return_value = MOCK_QUOTATIONS
+        mock_client = make_erp_mock(list_quotations=fresh(MOCK_QUOTATIONS))
         mock_get_client.return_value = mock_client
 
         response = self.client.get("/quotations?limit=15")
@@ -317,10 +332,9 @@ class TestDataEndpoints(unittest.TestCase):
         mock_client.list_quotations.assert_called_with(15)
 
     # ============ GET /quotations/{qtn_name} ============
-    @patch('app.controllers.data.get_client')
     def test_get_quotation_by_name(self, mock_get_client):
         """Test GET /quotations/{qtn_name} returns quotation details."""
-        mock_client = MagicMock()
+        mock_client = make_erp_mock()
         mock_qtn = {"name": "QTN-2024-001", "customer": "Customer B", "grand_total": 2500}
         mock_client.get_quotation.return_value = mock_qtn
         mock_get_client.return_value = mock_client
@@ -333,5 +347,20 @@ class TestDataEndpoints(unittest.TestCase):
         mock_client.get_quotation.assert_called_with("QTN-2024-001")
 
 
+class TestSharedERPClient(unittest.TestCase):
+    """Test the controllers share one ERPNext client."""
+
+    @patch('app.models.erp_client.ERPNextClient')
+    def test_controllers_reuse_one_client(self, mock_client_cls):
+        """Test get_client returns the same client across requests and controllers."""
+        get_shared_client.cache_clear()
+        try:
+            self.assertIs(data.get_client(), data.get_client())
+            self.assertIs(ai.get_client(), data.get_client())
+            self.assertEqual(mock_client_cls.call_count, 1)
+        finally:
+            get_shared_client.cache_clear()
+
+
 if __name__ == "__main__":
     unittest.main()
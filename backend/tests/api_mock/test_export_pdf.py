@@ -5,13 +5,17 @@ Tests POST /export/pdf using FastAPI TestClient and unittest.mock.
 
 import unittest
 from unittest.mock import patch, MagicMock
-from fastapi.testclient import TestClient
-import sys
 import os
+import tempfile
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
-
-from app.main import app
+from backend.tests._client import get_test_client
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Table, Paragraph
+from app.services import pdf_export
+from app.services.pdf_export import (
+    generate_pdf_report, _render_pdf_report, _render_list_as_table, _render_dict_as_section,
+    _pick_formatter, _format_cell_value, render_report_html,
+)
 
 
 class TestExportPDFEndpoint(unittest.TestCase):
@@ -20,7 +24,7 @@ class TestExportPDFEndpoint(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """Set up test client once for all tests."""
-        cls.client = TestClient(app)
+        cls.client = get_test_client()
 
     # ============ POST /export/pdf ============
     @patch('app.controllers.export.generate_pdf_report')
@@ -225,5 +229,81 @@ class TestExportPDFEndpoint(unittest.TestCase):
         self.assertIn("copilot_report_detect_delayed_orders.pdf", disposition)
 
 
+class TestPDFRendering(unittest.TestCase):
+    """Test PDF table rendering."""
+
+    def test_large_list_is_split_into_chunked_tables(self):
+        """Test long lists render as several tables that each repeat the header."""
+        data = [{"name": f"PO-{i}", "grand_total": i} for i in range(1200)]
+
+        tables = _render_list_as_table(data, getSampleStyleSheet())
+
+        self.assertEqual(len(tables), 3)
+        self.assertTrue(all(isinstance(t, Table) and t.repeatRows == 1 for t in tables))
+        self.assertEqual([t._nrows for t in tables], [501, 501, 201])
+        self.assertEqual(tables[2]._cellvalues[0], ["grand_total", "name"])
+
+    def test_column_formatters_match_format_cell_value(self):
+        """Test per-column formatters agree with _format_cell_value for mixed columns."""
+        values = [None, True, False, 0, 1.5, "x" * 150, "", list(range(7)), [], {"a": 1}]
+
+        for sample in values:
+            fmt = _pick_formatter(sample)
+            for value in values:
+                self.assertEqual(fmt(value), _format_cell_value(value))
+
+    def test_generate_pdf_report_with_list(self):
+        """Test a list payload renders to PDF bytes."""
+        with patch.object(pdf_export, "PDF_CACHE_DIR", ""), \
+                patch.object(pdf_export, "PDF_RENDER_WORKERS", 0):
+            pdf = generate_pdf_report([{"name": "PO-1", "grand_total": 10}], "list_purchase_orders")
+
+        self.assertTrue(pdf.startswith(b"%PDF"))
+
+    def test_dict_section_uses_one_paragraph_per_section(self):
+        """Test section lines share one Paragraph and markup characters are escaped."""
+        data = {"recommendations": [f"Check R&D <item {i}>" for i in range(50)],
+                "summary": {"total": 10, "note": "a < b"}}
+
+        elements = _render_dict_as_section(data, getSampleStyleSheet())
+
+        paragraphs = [e for e in elements if isinstance(e, Paragraph)]
+        self.assertEqual(len(paragraphs), 4)
+        self.assertIn("R&amp;D &lt;item 0&gt;", paragraphs[1].text)
+        self.assertTrue(_render_pdf_report(data, "report").startswith(b"%PDF"))
+
+    def test_generate_pdf_report_is_cached_on_disk(self):
+        """Test an identical export is served from the disk cache without re-rendering."""
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                patch.object(pdf_export, "PDF_CACHE_DIR", cache_dir), \
+                patch.object(pdf_export, "PDF_RENDER_WORKERS", 0), \
+                patch.object(pdf_export, "_render_pdf_report", return_value=b"%PDF-1.4 test") as render:
+            first = generate_pdf_report({"a": 1}, "report", "Title")
+            second = generate_pdf_report({"a": 1}, "report", "Title")
+            generate_pdf_report({"a": 2}, "report", "Title")
+
+            self.assertEqual(first, second)
+            self.assertEqual(render.call_count, 2)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_render_report_html_escapes_and_tables(self):
+        """Test the HTML report template renders tables and escapes values."""
+        html = render_report_html({"items": [{"name": "PO-1", "total": 5}], "note": "a < b"}, "report", "T")
+
+        self.assertIn("<th>name</th><th>total</th>", html)
+        self.assertIn("<td>PO-1</td><td>5</td>", html)
+        self.assertIn("a &lt; b", html)
+
+    def test_weasyprint_backend_falls_back_to_reportlab(self):
+        """Test PDF_BACKEND=weasyprint uses ReportLab when WeasyPrint is unavailable."""
+        with patch.object(pdf_export, "PDF_BACKEND", "weasyprint"), \
+                patch.object(pdf_export, "HTML", None), \
+                patch.object(pdf_export, "PDF_CACHE_DIR", ""), \
+                patch.object(pdf_export, "PDF_RENDER_WORKERS", 0), \
+                patch.object(pdf_export, "_render_pdf_report", return_value=b"%PDF") as render:
+            self.assertEqual(generate_pdf_report({"a": 1}, "report"), b"%PDF")
+            render.assert_called_once()
+
+
 if __name__ == "__main__":
     unittest.main()
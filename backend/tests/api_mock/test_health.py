@@ -4,13 +4,8 @@ Tests GET /health using FastAPI TestClient and unittest.
 """
 
 import unittest
-from fastapi.testclient import TestClient
-import sys
-import os
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
-
-from app.main import app
+from backend.tests._client import get_test_client
 
 
 class TestHealthEndpoint(unittest.TestCase):
@@ -19,7 +14,7 @@ class TestHealthEndpoint(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """Set up test client once for all tests."""
-        cls.client = TestClient(app)
+        cls.client = get_test_client()
 
     # ============ GET /health ============
     def test_health_endpoint_returns_ok(self):
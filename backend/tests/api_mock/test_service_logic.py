@@ -3,10 +3,23 @@ Unit tests for service functions.
 Tests detector and analyzer logic without API calls.
 """
 
+import asyncio
 import unittest
-from app.services.price_anomaly_detector import detect_price_anomalies
+import requests
+from unittest.mock import Mock, patch
+from app.services import price_anomaly_detector
+from app.services.price_anomaly_detector import detect_price_anomalies, count_anomalies
 from app.services.delayed_orders_detector import detect_delayed_orders
-from app.services.po_risk_analyzer import analyze_po_risks
+from app.services.po_risk_analyzer import analyze_po_risks, RISK_LABELS, HIGH, LOW
+from app.services.recommendation_explainer import explain_recommendations
+from app.services import rate_cache, po_approval_analyzer
+from app.services.po_approval_analyzer import (
+    calculate_price_anomalies, analyze_po_approval, analyze_pos_bulk, get_supplier_open_orders,
+    a_analyze_po_approval, get_historical_item_rate, clear_lookup_cache, TransientERPError,
+    prefetch_rates,
+)
+from backend.tests.api_mock.base_test import make_erp_mock
+
 
 
 class TestPriceAnomalyDetector(unittest.TestCase):
@@ -72,6 +85,79 @@ class TestPriceAnomalyDetector(unittest.TestCase):
         self.assertIsInstance(result, dict)
         self.assertIn("anomalies", result)
 
+    @unittest.skipIf(price_anomaly_detector.np is None, "numpy not installed")
+    def test_detect_price_anomalies_vectorized_matches_python(self):
+        """Test the NumPy path finds the same anomalies as the pure-Python loop."""
+        pos = [
+            {"item_code": f"ITEM-{i % 7}", "supplier": f"Supplier {i % 3}", "rate": 50 + (i * 37) % 60}
+            for i in range(price_anomaly_detector._NUMPY_MIN_ROWS + 100)
+        ]
+        
+        vectorized = detect_price_anomalies(pos)
+        with patch.object(price_anomaly_detector, "np", None):
+            pure = detect_price_anomalies(pos)
+        
+        self.assertGreater(vectorized["summary"]["anomaly_count"], 0)
+        self.assertEqual(vectorized["anomalies"], pure["anomalies"])
+
+    @unittest.skipIf(price_anomaly_detector.np is None, "numpy not installed")
+    def test_scan_anomalies_kernel_matches_numpy_mask(self):
+        """Test the (optionally jitted) scan kernel agrees with the NumPy comparison."""
+        np = price_anomaly_detector.np
+        rates = np.array([10.0, 13.0, 12.0, 30.0, 20.0])
+        item_ids = np.array([0, 0, 0, 1, 1], dtype=np.intp)
+        thresholds = np.array([12.0, 24.0])
+        
+        mask = price_anomaly_detector._scan_anomalies(rates, item_ids, thresholds)
+        
+        self.assertEqual(mask.tolist(), (rates > thresholds[item_ids]).tolist())
+
+    @unittest.skipIf(price_anomaly_detector.njit is None or price_anomaly_detector.np is None,
+                     "numba not installed")
+    def test_jitted_kernels_match_python(self):
+        """Test the Numba-compiled paths agree with the pure-Python ones on large inputs."""
+        pos = [
+            {"item_code": f"ITEM-{i % 7}", "supplier": f"Supplier {i % 3}", "rate": 50 + (i * 37) % 60}
+            for i in range(price_anomaly_detector._NUMPY_MIN_ROWS + 100)
+        ]
+        
+        jitted = (detect_price_anomalies(pos), count_anomalies(pos))
+        with patch.object(price_anomaly_detector, "_scan_anomalies_jit", None), \
+                patch.object(price_anomaly_detector, "_count_kernel_jit", None):
+            pure = (detect_price_anomalies(pos), count_anomalies(pos))
+        
+        self.assertGreater(jitted[1][1], 0)
+        self.assertEqual(jitted[0]["anomalies"], pure[0]["anomalies"])
+        self.assertEqual(jitted[1], pure[1])
+
+    def test_count_anomalies_small_input_skips_jit(self):
+        """Test inputs below _NUMPY_MIN_ROWS use the pure-Python count kernel."""
+        pos = [{"item_code": "ITEM-1", "rate": 100}, {"item_code": "ITEM-1", "rate": 250}]
+        jit = Mock()
+        
+        with patch.object(price_anomaly_detector, "_count_kernel_jit", jit):
+            self.assertEqual(count_anomalies(pos), (1, 1, 0))
+        jit.assert_not_called()
+
+    def test_count_anomalies_matches_detect_summary(self):
+        """Test the count-only path agrees with the full detector."""
+        pos = [
+            {"item_code": "ITEM-1", "supplier": "Supplier A", "rate": 100},
+            {"item_code": "ITEM-1", "supplier": "Supplier B", "rate": 100},
+            {"item_code": "ITEM-1", "supplier": "Supplier C", "rate": 250},
+            {"item_code": "ITEM-2", "supplier": "Supplier A", "rate": 50},
+            {"item_code": "ITEM-2", "supplier": "Supplier B", "rate": 65},
+        ]
+        
+        result = detect_price_anomalies(pos)
+        critical = sum(1 for a in result["anomalies"] if a["severity"] == "Critical")
+        
+        self.assertEqual(
+            count_anomalies(pos),
+            (result["summary"]["total_items_analyzed"], result["summary"]["anomaly_count"], critical),
+        )
+        self.assertEqual(count_anomalies([]), (0, 0, 0))
+
 
 class TestDelayedOrdersDetector(unittest.TestCase):
     """Test delayed order detection logic."""
@@ -231,6 +317,235 @@ class TestPORiskAnalyzer(unittest.TestCase):
         self.assertIsInstance(result, dict)
         self.assertIn("orders", result)
 
+    def test_analyze_po_risks_supplier_risk_ignores_other_suppliers(self):
+        """Test supplier risk only counts that supplier's pending orders."""
+        pos = [
+            {"name": "PO-001", "supplier": "Supplier A", "grand_total": 1000, "status": "Completed"},
+            {"name": "PO-002", "supplier": "Supplier B", "grand_total": 1000, "status": "To Bill"},
+            {"name": "PO-003", "supplier": "Supplier B", "grand_total": 1000, "status": "To Bill"},
+        ]
+        
+        result = analyze_po_risks(pos)
+        
+        supplier_a = next(o for o in result["orders"] if o["order_id"] == "PO-001")
+        self.assertEqual(supplier_a["risk_score"], 0)
+        self.assertEqual(supplier_a["reasons"], [])
+
+    def test_analyze_po_risks_level_id_matches_label(self):
+        """Test risk_level_id agrees with the display label and counters."""
+        pos = [
+            {"name": "PO-001", "supplier": "Supplier A", "grand_total": 1000, "status": "Completed"},
+            {"name": "PO-002", "supplier": "Supplier B", "grand_total": 0, "status": "To Receive",
+             "transaction_date": "2020-01-01"},
+        ]
+        
+        result = analyze_po_risks(pos)
+        
+        for order in result["orders"]:
+            self.assertEqual(order["risk_level"], RISK_LABELS[order["risk_level_id"]])
+        levels = [o["risk_level_id"] for o in result["orders"]]
+        self.assertEqual(result["high_risk_count"], levels.count(HIGH))
+        self.assertEqual(result["low_risk_count"], levels.count(LOW))
+
+
+
+class TestPOApprovalAnalyzer(unittest.TestCase):
+    """Test PO approval price checks."""
+
+    HISTORY = [
+        {"name": "PO-1", "supplier": "Supplier A", "status": "Completed",
+         "items": [{"item_code": "ITEM-1", "rate": 100}, {"item_code": "ITEM-2", "rate": 50}]},
+        {"name": "PO-2", "supplier": "Supplier A", "status": "To Receive",
+         "items": [{"item_code": "ITEM-1", "rate": 120}]},
+        {"name": "PO-3", "supplier": "Supplier B", "status": "Completed",
+         "items": [{"item_code": "ITEM-1", "rate": 10}]},
+        {"name": "PO-4", "supplier": "Supplier A", "status": "Cancelled",
+         "items": [{"item_code": "ITEM-1", "rate": 999}]},
+    ]
+
+    def setUp(self):
+        rate_cache.clear()
+        clear_lookup_cache()
+
+    def _list_purchase_orders(self, limit=20, filters=None, fields=None):
+        """Apply Frappe-style filters to HISTORY, one row per item when item fields are requested."""
+        wants_items = any("item_code" in f for f in fields or [])
+        rows = []
+        for po in self.HISTORY:
+            header = {k: v for k, v in po.items() if k != "items"}
+            for line in po["items"] if wants_items else [{}]:
+                row = {**header, **line}
+                if all(self._matches(row, f[-3:]) for f in filters or []):
+                    rows.append(row)
+        return rows if not limit else rows[:limit]
+
+    @staticmethod
+    def _matches(row, condition):
+        field, op, value = condition
+        return row.get(field) == value if op == "=" else row.get(field) not in value
+
+    def _client(self):
+        client = make_erp_mock()
+        client.list_purchase_orders.side_effect = self._list_purchase_orders
+        return client
+
+    def test_calculate_price_anomalies_fetches_history_once(self):
+        """Test history is fetched once per PO and filtered by supplier."""
+        client = self._client()
+        po = {"supplier": "Supplier A", "items": [
+            {"item_code": "ITEM-1", "rate": 150},
+            {"item_code": "ITEM-2", "rate": 50},
+            {"item_code": "ITEM-3", "rate": 5},
+        ]}
+
+        anomalies = calculate_price_anomalies(client, po)
+
+        self.assertEqual(client.list_purchase_orders.call_count, 1)
+        by_code = {a["item_code"]: a for a in anomalies}
+        self.assertEqual((by_code["ITEM-1"]["avg_rate"], by_code["ITEM-1"]["historical_count"]), (110.0, 2))
+        self.assertTrue(by_code["ITEM-1"]["is_anomaly"])
+        self.assertFalse(by_code["ITEM-2"]["is_anomaly"])
+        self.assertEqual(by_code["ITEM-3"]["historical_count"], 0)
+
+    def test_calculate_price_anomalies_reuses_cached_rates(self):
+        """Test a second PO with known items skips the ERPNext history fetch."""
+        client = self._client()
+        po = {"supplier": "Supplier A", "items": [{"item_code": "ITEM-1", "rate": 150}]}
+
+        calculate_price_anomalies(client, po)
+        anomalies = calculate_price_anomalies(client, {"supplier": "", "items": [{"item_code": "ITEM-1", "rate": 80}]})
+
+        self.assertEqual(client.list_purchase_orders.call_count, 1)
+        self.assertEqual(anomalies[0]["historical_count"], 3)
+
+    def test_async_analysis_matches_sync(self):
+        """Test a_analyze_po_approval returns the same result as the sync analyzer."""
+        po = {"name": "PO-10", "supplier": "Supplier A", "status": "Draft",
+              "items": [{"item_code": "ITEM-1", "rate": 150}]}
+        client = self._client()
+        client.get_purchase_order.return_value = po
+
+        result = asyncio.run(a_analyze_po_approval("PO-10", client))
+
+        self.assertEqual(result["decision"], "DO NOT APPROVE")
+        rate_cache.clear()
+        self.assertEqual(result, analyze_po_approval("PO-10", client))
+
+    def test_supplier_open_orders_filtered_server_side(self):
+        """Test open orders are counted from a supplier/status filtered request."""
+        client = self._client()
+
+        self.assertEqual(get_supplier_open_orders(client, "Supplier A"), 1)
+        kwargs = client.list_purchase_orders.call_args.kwargs
+        self.assertEqual(kwargs["limit"], 0)
+        self.assertEqual(kwargs["fields"], ["name"])
+        self.assertIn(["supplier", "=", "Supplier A"], kwargs["filters"])
+
+    def test_erp_failure_is_cached_and_typed(self):
+        """Test a failed lookup raises TransientERPError and is not retried within the TTL."""
+        client = make_erp_mock()
+        client.list_purchase_orders.side_effect = requests.ConnectionError("ERP down")
+
+        for _ in range(2):
+            with self.assertRaises(TransientERPError):
+                get_historical_item_rate(client, "ITEM-1", "Supplier A")
+        self.assertEqual(client.list_purchase_orders.call_count, 1)
+
+        client.get_purchase_order.return_value = {"name": "PO-10", "supplier": "Supplier A", "items": []}
+        self.assertEqual(analyze_po_approval("PO-10", client)["decision"], "APPROVE")
+
+    def test_rate_history_failure_is_cached(self):
+        """Test two analyses during an ERP outage request the rate history once."""
+        client = make_erp_mock()
+        client.list_purchase_orders.side_effect = requests.ConnectionError("ERP down")
+        client.get_purchase_order.return_value = {"name": "PO-10", "supplier": "Supplier A",
+                                                  "items": [{"item_code": "ITEM-1", "rate": 150}]}
+
+        for _ in range(2):
+            self.assertEqual(analyze_po_approval("PO-10", client)["decision"], "REVIEW")
+
+        history_calls = [c for c in client.list_purchase_orders.call_args_list
+                         if any("item_code" in f for f in c.kwargs.get("fields") or [])]
+        self.assertEqual(len(history_calls), 1)
+        self.assertEqual(client.list_purchase_orders.call_count, 2)
+
+    def test_malformed_erp_payload_degrades(self):
+        """Test a malformed ERPNext payload degrades the analysis instead of raising."""
+        client = make_erp_mock(list_purchase_orders=5)
+        client.get_purchase_order.return_value = {"name": "PO-10", "supplier": "Supplier A",
+                                                  "items": [{"item_code": "ITEM-1", "rate": 150}]}
+
+        with self.assertRaises(TransientERPError):
+            get_supplier_open_orders(client, "Supplier A")
+        # No usable history: flagged for review rather than crashing
+        self.assertEqual(analyze_po_approval("PO-10", client)["decision"], "REVIEW")
+
+    def test_prefetch_warms_cache_once_per_interval(self):
+        """Test prefetch_rates fills the cache so analysis skips the history fetch."""
+        client = self._client()
+
+        with patch.object(po_approval_analyzer, "_last_prefetch", 0.0):
+            self.assertTrue(prefetch_rates(client))
+            self.assertFalse(prefetch_rates(client))
+        anomalies = calculate_price_anomalies(client, {"supplier": "Supplier A",
+                                                       "items": [{"item_code": "ITEM-1", "rate": 150}]})
+
+        self.assertEqual(client.list_purchase_orders.call_count, 1)
+        self.assertEqual(anomalies[0]["historical_count"], 2)
+
+    def test_bump_invalidates_cached_rate(self):
+        """Test bump() forces the next analysis to refetch history."""
+        client = self._client()
+        po = {"supplier": "Supplier A", "items": [{"item_code": "ITEM-1", "rate": 150}]}
+
+        calculate_price_anomalies(client, po)
+        rate_cache.bump("Supplier A", "ITEM-1")
+        calculate_price_anomalies(client, po)
+
+        self.assertEqual(client.list_purchase_orders.call_count, 2)
+
+    def test_analyze_pos_bulk_matches_single_analysis(self):
+        """Test bulk analysis fetches history once and matches per-PO results."""
+        pos = {
+            "PO-10": {"name": "PO-10", "supplier": "Supplier A", "status": "Draft",
+                      "items": [{"item_code": "ITEM-1", "rate": 150}]},
+            "PO-11": {"name": "PO-11", "supplier": "Supplier B", "status": "Draft",
+                      "items": [{"item_code": "ITEM-1", "rate": 10}]},
+        }
+        client = self._client()
+        client.get_purchase_order.side_effect = pos.get
+
+        bulk = analyze_pos_bulk(["PO-10", "PO-11", "PO-404"], client)
+
+        # One rate-history request plus one open-order count request
+        self.assertEqual(client.list_purchase_orders.call_count, 2)
+        self.assertEqual(bulk[0]["decision"], "DO NOT APPROVE")
+        self.assertEqual(bulk[2]["summary"], "PO PO-404 not found")
+        rate_cache.clear()
+        for name, result in zip(["PO-10", "PO-11"], bulk):
+            self.assertEqual(result, analyze_po_approval(name, client))
+
+
+class TestRecommendationExplainer(unittest.TestCase):
+    """Test recommendation explanation logic."""
+
+    def test_unique_field_uses_keys_not_values(self):
+        """Test unique supplier/customer reason is keyed on field names only."""
+        items = [
+            {"item_code": "ITEM-1", "description": "Preferred supplier stock"},
+            {"item_code": "ITEM-2", "description": "Customer returns"},
+        ]
+        orders = [
+            {"name": "SO-1", "customer": "Customer A"},
+            {"name": "SO-2", "customer": "Customer A"},
+        ]
+        
+        item_result = explain_recommendations("list_items", "", items, [], [])
+        order_result = explain_recommendations("list_sales_orders", "", orders, [], [])
+        
+        self.assertEqual(len(item_result["reasons"]), 1)
+        self.assertEqual(order_result["reasons"][-1]["evidence"], "1 different customers involved")
+
 
 if __name__ == "__main__":
     unittest.main()